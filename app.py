@@ -12,12 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
 import sys
 import signal
 from types import FrameType
 
 from app_factory import create_app
-from utils.logging import logger
+from utils.logging import flush, logger
 import config
 
 # Create the Flask application using the factory pattern
@@ -26,8 +27,6 @@ app = create_app()
 def shutdown_handler(signal_int: int, frame: FrameType) -> None:
     logger.info(f"Caught Signal {signal.strsignal(signal_int)}")
 
-    from utils.logging import flush
-
     flush()
 
     # Safely exit program
@@ -40,7 +39,9 @@ if __name__ == "__main__":
     # handles Ctrl-C termination
     signal.signal(signal.SIGINT, shutdown_handler)
 
-    app.run(host="localhost", port=8080, debug=True)
+    # Development server only; production uses gunicorn (see gunicorn.conf.py)
+    app.run(host=config.HOST, port=config.PORT, debug=True)
 else:
-    # handles Cloud Run container termination
-    signal.signal(signal.SIGTERM, shutdown_handler)
+    # Under gunicorn, Cloud Run's SIGTERM is left to gunicorn's own graceful
+    # shutdown; logs are flushed when the worker process exits.
+    atexit.register(flush)
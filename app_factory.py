@@ -13,13 +13,15 @@
 # limitations under the License.
 
 from flask import Flask
-from google.cloud import aiplatform_v1
+from werkzeug.exceptions import HTTPException
 
+from clients import get_match_client
 import config
 from services import WineService, OCRService, ModelService, EmbeddingsService
 from routes.wine_routes import create_wine_routes
 from routes.ocr_routes import create_ocr_routes
 from utils.logging import logger
+from utils.responses import json_response
 
 
 def create_app() -> Flask:
@@ -36,11 +38,12 @@ def create_app() -> Flask:
     
     logger.info("Initializing Wine Recommender application")
     
-    # Initialize Vector Search client
-    vector_search_client = aiplatform_v1.MatchServiceClient(
-        client_options={"api_endpoint": config.API_ENDPOINT}
+    # Initialize Vector Search clients (one connection per pooled client)
+    vector_search_client = get_match_client()
+    logger.info(
+        "Vector Search client pool initialized",
+        extra={"api_endpoint": config.API_ENDPOINT, "pool_size": len(vector_search_client.clients)}
     )
-    logger.info("Vector Search client initialized", extra={"api_endpoint": config.API_ENDPOINT})
     
     # Initialize Model Service for Two Tower Model
     model_service = None
@@ -80,9 +83,14 @@ def create_app() -> Flask:
     app.register_blueprint(create_ocr_routes(ocr_service))
     logger.info("Routes registered")
     
+    @app.errorhandler(HTTPException)
+    def handle_http_exception(e: HTTPException):
+        """Return HTTP errors (bad JSON, oversized bodies, ...) as JSON like the routes do."""
+        return json_response({"error": e.description}, e.code)
+
     @app.route("/", methods=["GET"])
     def health_check():
         """Health check endpoint."""
-        return {"status": "healthy", "service": "wine-recommender"}, 200
+        return json_response({"status": "healthy", "service": "wine-recommender"})
     
     return app
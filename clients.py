@@ -0,0 +1,32 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+
+import config
+from services.match_client_pool import MatchClientPool
+
+
+@functools.lru_cache(maxsize=1)
+def get_match_client() -> MatchClientPool:
+    """Return the process-wide Vector Search client pool, creating it on first use.
+
+    Every caller shares the same gRPC connections, so building the app more
+    than once in a process does not open (and keep alive) another set of
+    channels.
+    """
+    return MatchClientPool(
+        config.API_ENDPOINT,
+        pool_size=config.VECTOR_SEARCH_CLIENT_POOL_SIZE
+    )
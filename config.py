@@ -16,8 +16,15 @@ import os
 
 # Flask Configuration
 DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+# Minimum level written by the structured logger (DEBUG, INFO, WARNING, ERROR)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 HOST = os.getenv("HOST", "localhost")
 PORT = int(os.getenv("PORT", "8080"))
+# Upper bound on request bodies (bytes); larger uploads are rejected with 413
+# before being read. Sized for wine label photos sent to /ocr.
+MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", str(10 * 1024 * 1024)))
+# Tighter bound for JSON endpoints, checked before the body is parsed
+MAX_JSON_BODY_BYTES = int(os.getenv("MAX_JSON_BODY_BYTES", str(64 * 1024)))
 
 # Vertex AI Vector Search Configuration
 API_ENDPOINT = os.getenv(
@@ -32,10 +39,37 @@ DEPLOYED_INDEX_ID = os.getenv(
     "DEPLOYED_INDEX_ID",
     "deployed_index_20251216_003124"
 )
+# Number of Vector Search clients (each with its own connection) used round-robin
+VECTOR_SEARCH_CLIENT_POOL_SIZE = int(os.getenv("VECTOR_SEARCH_CLIENT_POOL_SIZE", "4"))
+# Deadline for each FindNeighbors RPC (seconds)
+VECTOR_SEARCH_TIMEOUT_SECONDS = float(os.getenv("VECTOR_SEARCH_TIMEOUT_SECONDS", "10"))
 
 # Wine Search Configuration
 DEFAULT_NEIGHBOR_COUNT = int(os.getenv("DEFAULT_NEIGHBOR_COUNT", "10"))
 
+# Vector Search Batching Configuration
+# Coalesces concurrent queries into a single FindNeighbors RPC
+VECTOR_SEARCH_BATCHING = os.getenv("VECTOR_SEARCH_BATCHING", "False").lower() == "true"
+VECTOR_SEARCH_BATCH_MAX_SIZE = int(os.getenv("VECTOR_SEARCH_BATCH_MAX_SIZE", "32"))
+VECTOR_SEARCH_BATCH_WAIT_MS = float(os.getenv("VECTOR_SEARCH_BATCH_WAIT_MS", "10"))
+
+# Wine Embeddings Configuration
+# Load a parsed .npy copy of the embeddings file from next to it in GCS so
+# cold starts can skip JSON parsing (read-only). Workers on the same instance
+# memory-map one local copy of it under the temp dir, so the matrix is held
+# once rather than once per worker.
+EMBEDDINGS_NPY_CACHE = os.getenv("EMBEDDINGS_NPY_CACHE", "True").lower() == "true"
+# Upload the .npy copy to the embeddings bucket after parsing a new generation.
+# Off by default: it writes <blob>.npy and <blob>.ids.json next to the source
+# file and needs storage.objects.create and storage.objects.delete on the
+# bucket (e.g. roles/storage.objectUser) for the service account.
+EMBEDDINGS_NPY_CACHE_PUBLISH = os.getenv("EMBEDDINGS_NPY_CACHE_PUBLISH", "False").lower() == "true"
+# In-memory storage precision: "float32", or "float16" to halve memory and
+# gather bandwidth at ~3 significant digits (scores change by roughly 1e-3).
+# float16 matrices are private per worker, not shared through the mapping.
+# Any other value is rejected when the embeddings service starts.
+EMBEDDINGS_DTYPE = os.getenv("EMBEDDINGS_DTYPE", "float32").strip().lower()
+
 # Two Tower Model Configuration
 MODEL_ENDPOINT = os.getenv(
     "MODEL_ENDPOINT",
@@ -43,4 +77,16 @@ MODEL_ENDPOINT = os.getenv(
 )
 MODEL_PROJECT_ID = os.getenv("MODEL_PROJECT_ID", "enhanced-layout-465420-v5")
 MODEL_LOCATION = os.getenv("MODEL_LOCATION", "us-central1")
-MODEL_ENDPOINT_ID = os.getenv("MODEL_ENDPOINT_ID", "1904309059331293184")
\ No newline at end of file
+MODEL_ENDPOINT_ID = os.getenv("MODEL_ENDPOINT_ID", "1904309059331293184")
+
+# User Embedding Cache Configuration
+# Per-process cache of embeddings keyed by the 55 feature values, so repeat
+# queries skip the model endpoint. Set USER_EMBEDDING_CACHE_SIZE=0 to disable.
+USER_EMBEDDING_CACHE_SIZE = int(os.getenv("USER_EMBEDDING_CACHE_SIZE", "4096"))
+USER_EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("USER_EMBEDDING_CACHE_TTL_SECONDS", "300"))
+
+# Recommendation Cache Configuration
+# Per-process cache of /wines results keyed by a digest of the request
+# preferences and the limit. Set RECOMMENDATION_CACHE_SIZE=0 to disable.
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "10000"))
+RECOMMENDATION_CACHE_TTL_SECONDS = float(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", "300"))
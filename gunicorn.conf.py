@@ -0,0 +1,38 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Gunicorn configuration for serving the app in production.
+# https://docs.gunicorn.org/en/stable/settings.html
+
+import multiprocessing
+import os
+
+bind = f":{os.getenv('PORT', '8080')}"
+
+# Requests spend most of their time waiting on Vertex AI, so each worker
+# process serves many requests concurrently on threads.
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Keep client connections open between requests
+keepalive = 30
+
+# Timeout is set to 0 to disable the timeouts of the workers to allow
+# Cloud Run to handle instance scaling.
+timeout = 0
+
+# gRPC channels are not fork-safe, so by default every worker builds its own
+# clients after the fork instead of inheriting them from a preloaded app.
+preload_app = os.getenv("GUNICORN_PRELOAD", "False").lower() == "true"
@@ -12,12 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 from services import OCRService
 from utils.logging import logger
+from utils.responses import json_response, prebuilt_json, prebuilt_response
 
 ocr_bp = Blueprint('ocr', __name__, url_prefix='/ocr')
 
+# Fixed error bodies, serialized once at import
+_NO_IMAGE_PROVIDED = prebuilt_json({"error": "No image file provided"})
+_NO_IMAGE_SELECTED = prebuilt_json({"error": "No image file selected"})
+_NO_IMAGES_PROVIDED = prebuilt_json({"error": "No image files provided"})
+
 
 def create_ocr_routes(ocr_service: OCRService):
     """
@@ -41,24 +47,53 @@ def create_ocr_routes(ocr_service: OCRService):
         # Check if image is in request
         if 'image' not in request.files:
             logger.warning("OCR request missing image file")
-            return jsonify({"error": "No image file provided"}), 400
+            return prebuilt_response(_NO_IMAGE_PROVIDED, 400)
         
         image_file = request.files['image']
         if image_file.filename == '':
             logger.warning("OCR request with empty filename")
-            return jsonify({"error": "No image file selected"}), 400
+            return prebuilt_response(_NO_IMAGE_SELECTED, 400)
         
         try:
-            # Read image content
-            image_content = image_file.read()
-            logger.info("Processing OCR request", extra={"image_size": len(image_content)})
+            # Hand the upload stream to the service so the image is only read once
+            logger.info("Processing OCR request", extra={"content_length": request.content_length})
             
-            extracted_text = ocr_service.extract_text_from_image(image_content)
+            extracted_text = ocr_service.extract_text_from_image(image_file.stream)
             logger.info("OCR extraction successful", extra={"text_length": len(extracted_text)})
             
-            return jsonify({"text": extracted_text})
+            return json_response({"text": extracted_text})
         except Exception as e:
             logger.error("OCR extraction failed", extra={"error": str(e)})
-            return jsonify({"error": str(e)}), 500
+            return json_response({"error": str(e)}, 500)
+
+    @ocr_bp.route("/batch", methods=["POST"])
+    def extract_text_from_images():
+        """
+        Extract text from several uploaded images using batched OCR.
+
+        Request should contain:
+        - images: One or more image files in multipart/form-data
+
+        Returns:
+            JSON response with the extracted text per image, in upload order
+        """
+        image_files = [f for f in request.files.getlist('images') if f.filename != '']
+        if not image_files:
+            logger.warning("Batch OCR request missing image files")
+            return prebuilt_response(_NO_IMAGES_PROVIDED, 400)
+
+        try:
+            logger.info(
+                "Processing batch OCR request",
+                extra={"image_count": len(image_files), "content_length": request.content_length}
+            )
+
+            texts = ocr_service.extract_text_from_images([f.stream for f in image_files])
+            logger.info("Batch OCR extraction successful", extra={"image_count": len(texts)})
+
+            return json_response({"texts": texts})
+        except Exception as e:
+            logger.error("Batch OCR extraction failed", extra={"error": str(e)})
+            return json_response({"error": str(e)}, 500)
     
     return ocr_bp
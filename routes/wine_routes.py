@@ -12,12 +12,32 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from flask import Blueprint, request, jsonify
+from itertools import islice
+import logging
+
+from flask import Blueprint, request
+import numpy as np
+
+from config import DEFAULT_NEIGHBOR_COUNT
 from services import WineService
+from utils.json_body import get_json_body
 from utils.logging import logger
+from utils.responses import json_response, prebuilt_json, prebuilt_response
 
 wine_bp = Blueprint('wines', __name__, url_prefix='/wines')
 
+# Fixed error bodies, serialized once at import
+_MISSING_BODY = prebuilt_json({"error": "Missing request body."})
+_LIMIT_TOO_SMALL = prebuilt_json({"error": "limit must be at least 1"})
+_LIMIT_TOO_LARGE = prebuilt_json({"error": "limit cannot exceed 1000"})
+_MISSING_USER_DATA = prebuilt_json({"error": "Missing user_data"})
+_MISSING_WINE_IDS = prebuilt_json({"error": "Missing wine_ids"})
+
+
+def _wants_arrays() -> bool:
+    """Whether the caller asked for parallel arrays (?format=arrays) instead of an ID-keyed object."""
+    return request.args.get("format") == "arrays"
+
 
 def create_wine_routes(wine_service: WineService):
     """
@@ -34,30 +54,34 @@ def create_wine_routes(wine_service: WineService):
         Get wine recommendations based on user preferences using the Two Tower Model.
         
         Query parameters:
-        - limit: (optional) Number of wine recommendations to return (default: 10, max: 1000)
+        - limit: (optional) Number of wine recommendations to return (default: DEFAULT_NEIGHBOR_COUNT, max: 1000)
+        - format: (optional) "arrays" to return dot products as a list parallel to "wines"
         
         Request body should contain:
         - 55 user preference features (see USER_FEATURE_NAMES)
         - user_id: (optional) User ID (GUID) for tracking
         
         Returns:
-            JSON response with wine IDs and similarity scores
+            JSON response with wine IDs and similarity scores:
+            {"wines": ["100001", ...], "dot_products": {"100001": 0.342, ...}}
+            or, with format=arrays:
+            {"wines": ["100001", ...], "dot_products": [0.342, ...]}
         """
-        data = request.get_json()
+        data = get_json_body()
         if not data:
             logger.warning("Wine recommendation request missing body")
-            return jsonify({"error": "Missing request body."}), 400
+            return prebuilt_response(_MISSING_BODY, 400)
         
         try:
             # Extract optional user_id from the request body
             user_id = data.get("user_id")
             
-            # Extract optional limit parameter from query string (default: 10, max: 1000)
-            limit = request.args.get("limit", default=10, type=int)
+            # Extract optional limit parameter from query string (default: DEFAULT_NEIGHBOR_COUNT, max: 1000)
+            limit = request.args.get("limit", default=DEFAULT_NEIGHBOR_COUNT, type=int)
             if limit < 1:
-                return jsonify({"error": "limit must be at least 1"}), 400
+                return prebuilt_response(_LIMIT_TOO_SMALL, 400)
             if limit > 1000:
-                return jsonify({"error": "limit cannot exceed 1000"}), 400
+                return prebuilt_response(_LIMIT_TOO_LARGE, 400)
 
             # Use the Two Tower Model approach
             wine_ids, dot_products = wine_service.get_wine_recommendations(
@@ -69,13 +93,18 @@ def create_wine_routes(wine_service: WineService):
                 "Wine recommendations generated", 
                 extra={"count": len(wine_ids), "user_id": user_id, "limit": limit}
             )
-            return jsonify({"wines": wine_ids, "dot_products": dot_products})
+            if _wants_arrays():
+                return json_response({
+                    "wines": wine_ids,
+                    "dot_products": [dot_products[wine_id] for wine_id in wine_ids]
+                })
+            return json_response({"wines": wine_ids, "dot_products": dot_products})
         except ValueError as ve:
             logger.error("User preferences validation failed", extra={"error": str(ve)})
-            return jsonify({"error": str(ve)}), 400
+            return json_response({"error": str(ve)}, 400)
         except Exception as e:
             logger.error("Wine recommendation failed", extra={"error": str(e)})
-            return jsonify({"error": str(e)}), 500
+            return json_response({"error": str(e)}, 500)
     
     @wine_bp.route("/score", methods=["POST"])
     def score_wines():
@@ -91,72 +120,91 @@ def create_wine_routes(wine_service: WineService):
         - wine_ids: List of wine IDs to score (e.g., ["100001", "100002"])
         - user_id: (optional) User ID (GUID) for tracking
 
+        Query parameters:
+        - format: (optional) "arrays" to return parallel "wines" / "dot_products" lists
+
         Returns:
             JSON response with dot products: {"dot_products": {"100001": 0.342, "100002": 0.289}}
+            or, with format=arrays (wines without embeddings are omitted):
+            {"wines": ["100001", "100002"], "dot_products": [0.342, 0.289]}
             Note: For normalized embeddings, dot products are typically in [-1, 1] range
         """
-        data = request.get_json()
+        data = get_json_body()
         if not data:
             logger.warning("Wine scoring request missing body")
-            return jsonify({"error": "Missing request body."}), 400
+            return prebuilt_response(_MISSING_BODY, 400)
 
         user_data = data.get("user_data")
         wine_ids = data.get("wine_ids", [])
         user_id = data.get("user_id")
 
         if not user_data:
-            return jsonify({"error": "Missing user_data"}), 400
+            return prebuilt_response(_MISSING_USER_DATA, 400)
 
         if not wine_ids:
-            return jsonify({"error": "Missing wine_ids"}), 400
+            return prebuilt_response(_MISSING_WINE_IDS, 400)
 
         try:
             logger.info(
                 "Scoring wines - generating user embedding",
-                extra={"user_id": user_id, "wine_ids": wine_ids, "wine_count": len(wine_ids)}
+                extra={"user_id": user_id, "wine_count": len(wine_ids)}
             )
 
             # Generate user embedding
             user_embedding = wine_service.model_service.generate_user_embedding(user_data)
 
-            import numpy as np
-            user_norm = np.linalg.norm(user_embedding)
-            logger.info(
-                "User embedding generated for scoring",
-                extra={
-                    "embedding_dim": len(user_embedding),
-                    "embedding_norm": float(user_norm),
-                    "embedding_min": float(min(user_embedding)),
-                    "embedding_max": float(max(user_embedding)),
-                    "embedding_mean": float(np.mean(user_embedding)),
-                    "is_normalized": abs(user_norm - 1.0) < 0.01,
-                    "user_id": user_id
-                }
-            )
+            log_stats = logger.is_enabled_for(logging.INFO)
+            if log_stats:
+                user_norm = np.linalg.norm(user_embedding)
+                logger.info(
+                    "User embedding generated for scoring",
+                    extra={
+                        "embedding_dim": len(user_embedding),
+                        "embedding_norm": float(user_norm),
+                        "embedding_min": float(np.min(user_embedding)),
+                        "embedding_max": float(np.max(user_embedding)),
+                        "embedding_mean": float(np.mean(user_embedding)),
+                        "is_normalized": bool(abs(user_norm - 1.0) < 0.01),
+                        "user_id": user_id
+                    }
+                )
 
             # Calculate dot products for specific wines
             dot_products = wine_service.score_wines(user_embedding, wine_ids)
 
-            logger.info(
-                "Dot products calculated successfully",
-                extra={
-                    "wine_count": len(wine_ids),
-                    "results_returned": len(dot_products),
-                    "dot_products_sample": {k: v for k, v in list(dot_products.items())[:5]},
-                    "dot_product_min": min(dot_products.values()) if dot_products else None,
-                    "dot_product_max": max(dot_products.values()) if dot_products else None,
-                    "dot_product_mean": sum(dot_products.values()) / len(dot_products) if dot_products else None,
-                    "user_id": user_id
-                }
-            )
-            return jsonify({"dot_products": dot_products})
+            if log_stats:
+                dot_min = dot_max = dot_mean = None
+                if dot_products:
+                    # One array for all three reductions instead of three Python passes
+                    values = np.fromiter(dot_products.values(), dtype=np.float64, count=len(dot_products))
+                    dot_min = float(values.min())
+                    dot_max = float(values.max())
+                    dot_mean = float(values.mean())
+                logger.info(
+                    "Dot products calculated successfully",
+                    extra={
+                        "wine_count": len(wine_ids),
+                        "results_returned": len(dot_products),
+                        "dot_products_sample": dict(islice(dot_products.items(), 5)),
+                        "dot_product_min": dot_min,
+                        "dot_product_max": dot_max,
+                        "dot_product_mean": dot_mean,
+                        "user_id": user_id
+                    }
+                )
+            if _wants_arrays():
+                return json_response({
+                    "wines": list(dot_products.keys()),
+                    "dot_products": list(dot_products.values())
+                })
+            return json_response({"dot_products": dot_products})
 
         except ValueError as ve:
             logger.error("Wine scoring validation failed", extra={"error": str(ve)})
-            return jsonify({"error": str(ve)}), 400
+            return json_response({"error": str(ve)}, 400)
         except Exception as e:
             logger.error("Wine scoring failed", extra={"error": str(e)})
-            return jsonify({"error": str(e)}), 500
+            return json_response({"error": str(e)}, 500)
 
     @wine_bp.route("/legacy", methods=["POST"])
     def get_wine_neighbors_legacy():
@@ -166,6 +214,9 @@ def create_wine_routes(wine_service: WineService):
         This endpoint is kept for backward compatibility but should not be used
         for new implementations. Use /wines or /wines/recommend instead.
 
+        Query parameters:
+        - limit: (optional) Number of similar wines to return (default: DEFAULT_NEIGHBOR_COUNT, max: 1000)
+
         Request body should contain:
         - type: Wine type (Red, White, Rose, Sparkling)
         - body: Body score (1-5)
@@ -175,24 +226,30 @@ def create_wine_routes(wine_service: WineService):
         Returns:
             JSON response with wine IDs and similarity scores
         """
-        data = request.get_json()
+        data = get_json_body()
         if not data:
             logger.warning("Wine search request missing body")
-            return jsonify({"error": "Missing request body."}), 400
+            return prebuilt_response(_MISSING_BODY, 400)
+
+        limit = request.args.get("limit", default=DEFAULT_NEIGHBOR_COUNT, type=int)
+        if limit < 1:
+            return prebuilt_response(_LIMIT_TOO_SMALL, 400)
+        if limit > 1000:
+            return prebuilt_response(_LIMIT_TOO_LARGE, 400)
 
         try:
             wine_vector = wine_service.parse_wine_vector(data)
             logger.info("Wine vector parsed successfully (legacy)", extra={"vector_length": len(wine_vector)})
         except ValueError as ve:
             logger.error("Wine vector validation failed", extra={"error": str(ve)})
-            return jsonify({"error": str(ve)}), 400
+            return json_response({"error": str(ve)}, 400)
 
         try:
-            wine_neighbors, scores = wine_service.find_similar_wines(wine_vector)
+            wine_neighbors, scores = wine_service.find_similar_wines(wine_vector, limit)
             logger.info("Wine neighbors found (legacy)", extra={"count": len(wine_neighbors)})
-            return jsonify({"wines": wine_neighbors, "scores": scores})
+            return json_response({"wines": wine_neighbors, "scores": scores})
         except Exception as e:
             logger.error("Wine search failed", extra={"error": str(e)})
-            return jsonify({"error": str(e)}), 500
+            return json_response({"error": str(e)}, 500)
 
     return wine_bp
@@ -12,14 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .wine_schema import WINE_SCHEMA
 from .user_schema import (
+    SIMPLE_USER_PREFERENCES_SCHEMA,
+    SIMPLE_USER_PREFERENCES_VALIDATOR,
     USER_FEATURE_NAMES,
     USER_FEATURES_SCHEMA,
-    USER_PREFERENCES_SCHEMA, 
-    SIMPLE_USER_PREFERENCES_SCHEMA,
+    USER_FEATURES_VALIDATOR,
+    USER_PREFERENCES_SCHEMA,
     WINE_QUERY_SCHEMA
 )
+from .wine_schema import WINE_SCHEMA
 
 __all__ = [
     'WINE_SCHEMA',
@@ -27,5 +29,7 @@ __all__ = [
     'USER_FEATURES_SCHEMA',
     'USER_PREFERENCES_SCHEMA',
     'SIMPLE_USER_PREFERENCES_SCHEMA',
-    'WINE_QUERY_SCHEMA'
+    'WINE_QUERY_SCHEMA',
+    'USER_FEATURES_VALIDATOR',
+    'SIMPLE_USER_PREFERENCES_VALIDATOR'
 ]
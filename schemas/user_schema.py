@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import fastjsonschema
+
 # Feature names in order for the 55-dimensional user feature vector
 USER_FEATURE_NAMES = [
     # Basic features (8)
@@ -200,4 +202,8 @@ SIMPLE_USER_PREFERENCES_SCHEMA = {
 
 # Aliases
 USER_PREFERENCES_SCHEMA = USER_FEATURES_SCHEMA  # Primary schema
-WINE_QUERY_SCHEMA = SIMPLE_USER_PREFERENCES_SCHEMA  # Legacy compatibility
\ No newline at end of file
+WINE_QUERY_SCHEMA = SIMPLE_USER_PREFERENCES_SCHEMA  # Legacy compatibility
+# Validators compiled once at import into plain Python functions; each raises
+# fastjsonschema.JsonSchemaException when the data does not match
+USER_FEATURES_VALIDATOR = fastjsonschema.compile(USER_FEATURES_SCHEMA)
+SIMPLE_USER_PREFERENCES_VALIDATOR = fastjsonschema.compile(SIMPLE_USER_PREFERENCES_SCHEMA)
@@ -12,11 +12,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
-from typing import Dict, List, Optional
+import hashlib
+import io
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
 from google.cloud import storage
+import numpy as np
+import orjson
+
+import config
 from utils.logging import logger
 
+# Storage precisions EMBEDDINGS_DTYPE may select; integer types would
+# silently truncate the embeddings
+SUPPORTED_DTYPES = ("float32", "float16")
+
 
 class EmbeddingsService:
     """Service for loading and managing wine embeddings in memory."""
@@ -27,46 +39,82 @@ class EmbeddingsService:
 
         Args:
             gcs_uri: GCS URI of the embeddings file
+
+        Raises:
+            ValueError: If EMBEDDINGS_DTYPE is not a supported storage precision
         """
+        if config.EMBEDDINGS_DTYPE not in SUPPORTED_DTYPES:
+            raise ValueError(
+                f"Invalid EMBEDDINGS_DTYPE {config.EMBEDDINGS_DTYPE!r}: "
+                f"must be one of {', '.join(SUPPORTED_DTYPES)}"
+            )
+
         self.gcs_uri = gcs_uri
-        self.embeddings: Dict[str, List[float]] = {}
+        self.bucket_name, self.blob_name = self._parse_gs_uri(gcs_uri)
+        # All embeddings in one contiguous (N, D) float32 matrix, with the
+        # row for each wine ID
+        self._matrix: np.ndarray = np.empty((0, 0), dtype=np.float32)
+        self._id_to_row: Dict[str, int] = {}
         self._load_embeddings()
 
+    @staticmethod
+    def _parse_gs_uri(gcs_uri: str) -> Tuple[str, str]:
+        """
+        Split a gs://bucket/path URI into its bucket and object names.
+
+        Args:
+            gcs_uri: GCS URI of the embeddings file
+
+        Returns:
+            Tuple of (bucket_name, blob_name)
+
+        Raises:
+            ValueError: If the URI is not a gs:// URI with both parts
+        """
+        if not gcs_uri.startswith("gs://"):
+            raise ValueError(f"Invalid GCS URI: {gcs_uri}")
+
+        bucket_name, _, blob_name = gcs_uri[5:].partition("/")
+        if not bucket_name or not blob_name:
+            raise ValueError(f"Invalid GCS URI: {gcs_uri}")
+        return bucket_name, blob_name
+
     def _load_embeddings(self):
         """Load wine embeddings from GCS into memory."""
         logger.info("Loading wine embeddings from GCS", extra={"uri": self.gcs_uri})
 
         try:
-            # Parse GCS URI
-            if not self.gcs_uri.startswith("gs://"):
-                raise ValueError(f"Invalid GCS URI: {self.gcs_uri}")
-
-            path_parts = self.gcs_uri[5:].split("/", 1)
-            bucket_name = path_parts[0]
-            blob_name = path_parts[1]
-
             # Download from GCS
             storage_client = storage.Client()
-            bucket = storage_client.bucket(bucket_name)
-            blob = bucket.blob(blob_name)
+            bucket = storage_client.bucket(self.bucket_name)
+            blob = bucket.blob(self.blob_name)
 
-            # Download as string and parse JSON lines
-            content = blob.download_as_text()
+            from_cache = False
+            if config.EMBEDDINGS_NPY_CACHE:
+                # Fetch the generation the cache is keyed on
+                blob.reload()
+                from_cache = self._load_npy_cache(bucket, blob)
 
-            count = 0
-            for line in content.strip().split('\n'):
-                if line:
-                    entry = json.loads(line)
-                    wine_id = str(entry['id'])
-                    embedding = entry['embedding']
-                    self.embeddings[wine_id] = embedding
-                    count += 1
+            if not from_cache:
+                self._parse_jsonl(blob)
+                if config.EMBEDDINGS_NPY_CACHE:
+                    self._save_npy_cache(bucket, blob)
+
+            if config.EMBEDDINGS_DTYPE != "float32":
+                # Reduced-precision storage; the .npy cache stays float32
+                self._matrix = self._matrix.astype(config.EMBEDDINGS_DTYPE)
+
+            # Rows are handed out as views, so keep callers from mutating them
+            self._matrix.setflags(write=False)
 
             logger.info(
                 "Wine embeddings loaded successfully",
                 extra={
-                    "total_wines": count,
-                    "memory_size_mb": len(content) / (1024 * 1024)
+                    "total_wines": len(self._id_to_row),
+                    "embedding_dim": self._matrix.shape[1],
+                    "dtype": str(self._matrix.dtype),
+                    "memory_size_mb": self._matrix.nbytes / (1024 * 1024),
+                    "from_npy_cache": from_cache
                 }
             )
         except Exception as e:
@@ -76,7 +124,190 @@ class EmbeddingsService:
             )
             raise Exception(f"Failed to load embeddings: {str(e)}")
 
-    def get_embedding(self, wine_id: str) -> Optional[List[float]]:
+    def _parse_jsonl(self, blob: storage.Blob) -> None:
+        """
+        Parse the embeddings JSON lines file into the matrix and row index.
+
+        Args:
+            blob: GCS blob of the embeddings file
+        """
+        # Stream the JSON lines instead of holding the whole file as a str
+        rows = []
+        with blob.open("rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = orjson.loads(line)
+                wine_id = str(entry['id'])
+                embedding = np.asarray(entry['embedding'], dtype=np.float32)
+                if wine_id in self._id_to_row:
+                    # Later entries win, as with the previous dict storage
+                    rows[self._id_to_row[wine_id]] = embedding
+                else:
+                    self._id_to_row[wine_id] = len(rows)
+                    rows.append(embedding)
+
+        if rows:
+            self._matrix = np.stack(rows)
+
+    def _local_cache_paths(self, blob: storage.Blob) -> Tuple[str, str]:
+        """
+        Local paths of the .npy cache for the current generation of the embeddings file.
+
+        Every worker process on the instance resolves the same paths, so they
+        map the same file and share its pages instead of each holding a copy.
+
+        Args:
+            blob: GCS blob of the embeddings file (with metadata loaded)
+
+        Returns:
+            Tuple of (matrix_path, ids_path)
+        """
+        key = hashlib.sha1(f"{self.gcs_uri}#{blob.generation}".encode()).hexdigest()[:16]
+        base = os.path.join(tempfile.gettempdir(), f"wine-embeddings-{key}")
+        return f"{base}.npy", f"{base}.ids.json"
+
+    @staticmethod
+    def _write_local_file(path: str, data: bytes) -> None:
+        """Atomically write data to path, so concurrent workers never see a partial file."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _map_local_cache(self, blob: storage.Blob) -> bool:
+        """
+        Memory-map the local .npy cache if another worker (or an earlier load) wrote it.
+
+        Args:
+            blob: GCS blob of the embeddings file (with metadata loaded)
+
+        Returns:
+            True if the cache was mapped, False if it is missing or malformed
+        """
+        matrix_path, ids_path = self._local_cache_paths(blob)
+        if not (os.path.exists(matrix_path) and os.path.exists(ids_path)):
+            return False
+
+        try:
+            with open(ids_path, "rb") as f:
+                wine_ids = orjson.loads(f.read())
+            matrix = np.load(matrix_path, mmap_mode="r")
+        except Exception as e:
+            logger.warning(
+                "Failed to read local embeddings .npy cache",
+                extra={"error": str(e), "path": matrix_path}
+            )
+            return False
+
+        if matrix.ndim != 2 or matrix.dtype != np.float32 or matrix.shape[0] != len(wine_ids):
+            logger.warning("Local embeddings .npy cache is malformed", extra={"path": matrix_path})
+            return False
+
+        self._matrix = matrix
+        self._id_to_row = {wine_id: row for row, wine_id in enumerate(wine_ids)}
+        return True
+
+    def _load_npy_cache(self, bucket: storage.Bucket, blob: storage.Blob) -> bool:
+        """
+        Load the matrix and IDs from the .npy cache written next to the embeddings file.
+
+        A copy already downloaded by another worker on this instance is mapped
+        directly; otherwise the GCS copy is downloaded to the shared local path
+        first. The cache is only used when it was built from the current
+        generation of the embeddings file.
+
+        Args:
+            bucket: Bucket holding the embeddings file
+            blob: GCS blob of the embeddings file (with metadata loaded)
+
+        Returns:
+            True if the cache was loaded, False if it is missing, stale or unreadable
+        """
+        if self._map_local_cache(blob):
+            return True
+
+        npy_blob = bucket.get_blob(f"{blob.name}.npy")
+        ids_blob = bucket.get_blob(f"{blob.name}.ids.json")
+        generation = str(blob.generation)
+        for cache_blob in (npy_blob, ids_blob):
+            if cache_blob is None or (cache_blob.metadata or {}).get("source_generation") != generation:
+                logger.info("Embeddings .npy cache missing or stale", extra={"uri": self.gcs_uri})
+                return False
+
+        matrix_path, ids_path = self._local_cache_paths(blob)
+        try:
+            self._write_local_file(ids_path, ids_blob.download_as_bytes())
+            self._write_local_file(matrix_path, npy_blob.download_as_bytes())
+        except Exception as e:
+            logger.warning(
+                "Failed to download embeddings .npy cache",
+                extra={"error": str(e), "uri": self.gcs_uri}
+            )
+            return False
+
+        return self._map_local_cache(blob)
+
+    def _save_npy_cache(self, bucket: storage.Bucket, blob: storage.Blob) -> None:
+        """
+        Write the parsed matrix and IDs to the local and (optionally) GCS .npy caches.
+
+        The local copy lets the other workers on this instance map the matrix
+        instead of parsing it again, and this process switches to the mapping
+        as well. The GCS copy serves later cold starts and is only uploaded
+        when EMBEDDINGS_NPY_CACHE_PUBLISH is set. Failures (e.g. a read-only
+        service account) are logged and otherwise ignored.
+
+        Args:
+            bucket: Bucket holding the embeddings file
+            blob: GCS blob of the embeddings file (with metadata loaded)
+        """
+        wine_ids = [None] * len(self._id_to_row)
+        for wine_id, row in self._id_to_row.items():
+            wine_ids[row] = wine_id
+
+        buffer = io.BytesIO()
+        np.save(buffer, self._matrix)
+        matrix_bytes = buffer.getvalue()
+        ids_bytes = orjson.dumps(wine_ids)
+
+        matrix_path, ids_path = self._local_cache_paths(blob)
+        try:
+            self._write_local_file(ids_path, ids_bytes)
+            self._write_local_file(matrix_path, matrix_bytes)
+            self._map_local_cache(blob)
+        except Exception as e:
+            logger.warning(
+                "Failed to write local embeddings .npy cache",
+                extra={"error": str(e), "path": matrix_path}
+            )
+
+        if not config.EMBEDDINGS_NPY_CACHE_PUBLISH:
+            return
+
+        metadata = {"source_generation": str(blob.generation)}
+        try:
+            ids_blob = bucket.blob(f"{blob.name}.ids.json")
+            ids_blob.metadata = metadata
+            ids_blob.upload_from_string(ids_bytes, content_type="application/json")
+
+            npy_blob = bucket.blob(f"{blob.name}.npy")
+            npy_blob.metadata = metadata
+            npy_blob.upload_from_string(matrix_bytes, content_type="application/octet-stream")
+        except Exception as e:
+            logger.warning(
+                "Failed to write embeddings .npy cache",
+                extra={"error": str(e), "uri": self.gcs_uri}
+            )
+            return
+
+        logger.info("Embeddings .npy cache written", extra={"uri": f"{self.gcs_uri}.npy"})
+
+    def get_embedding(self, wine_id: str) -> Optional[np.ndarray]:
         """
         Get embedding for a specific wine (O(1) lookup).
 
@@ -84,11 +315,14 @@ class EmbeddingsService:
             wine_id: Wine ID as string
 
         Returns:
-            Wine embedding vector or None if not found
+            Wine embedding vector (a read-only view of the matrix row) or None if not found
         """
-        return self.embeddings.get(wine_id)
+        row = self._id_to_row.get(wine_id)
+        if row is None:
+            return None
+        return self._matrix[row]
 
-    def get_embeddings(self, wine_ids: List[str]) -> Dict[str, List[float]]:
+    def get_embeddings(self, wine_ids: List[str]) -> Dict[str, np.ndarray]:
         """
         Get embeddings for multiple wines (O(n) where n = number of wine_ids).
 
@@ -98,27 +332,43 @@ class EmbeddingsService:
         Returns:
             Dictionary mapping wine IDs to embeddings (only for found wines)
         """
-        result = {}
-        for wine_id in wine_ids:
-            embedding = self.get_embedding(wine_id)
-            if embedding is not None:
-                result[wine_id] = embedding
+        found_ids, matrix = self.get_embedding_matrix(wine_ids)
+        return dict(zip(found_ids, matrix))
+
+    def get_embedding_matrix(self, wine_ids: List[str]) -> Tuple[List[str], np.ndarray]:
+        """
+        Get embeddings for multiple wines as one (n, D) matrix.
+
+        Rows are gathered with a single fancy-index copy instead of a Python loop,
+        then widened to float32 if the embeddings are stored at lower precision.
+
+        Args:
+            wine_ids: List of wine IDs
+
+        Returns:
+            Tuple of (found_ids, matrix) where row i of the float32 matrix is the
+            embedding of found_ids[i]. Wines without an embedding are skipped.
+        """
+        id_to_row = self._id_to_row
+        found_ids = [wine_id for wine_id in wine_ids if wine_id in id_to_row]
+        # NumPy has no BLAS path for float16, so only the gather runs at storage precision
+        matrix = self._matrix[[id_to_row[wine_id] for wine_id in found_ids]].astype(np.float32, copy=False)
 
         logger.info(
             "Retrieved embeddings",
             extra={
                 "requested": len(wine_ids),
-                "found": len(result),
-                "missing": len(wine_ids) - len(result)
+                "found": len(found_ids),
+                "missing": len(wine_ids) - len(found_ids)
             }
         )
 
-        return result
+        return found_ids, matrix
 
     def has_embedding(self, wine_id: str) -> bool:
         """Check if embedding exists for a wine."""
-        return wine_id in self.embeddings
+        return wine_id in self._id_to_row
 
     def get_total_count(self) -> int:
         """Get total number of wines with embeddings."""
-        return len(self.embeddings)
+        return len(self._id_to_row)
@@ -0,0 +1,72 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import itertools
+from typing import Any, List, Tuple
+
+from google.cloud import aiplatform_v1
+from google.cloud.aiplatform_v1.services.match_service.transports import MatchServiceGrpcTransport
+import grpc
+
+# Give every client its own subchannel pool so each one opens a separate
+# HTTP/2 connection instead of sharing gRPC's global subchannel.
+# Keepalive pings keep idle connections from being dropped by load balancers
+# between bursts, so the next request does not pay for a new TLS handshake.
+CHANNEL_OPTIONS: List[Tuple[str, Any]] = [
+    ("grpc.use_local_subchannel_pool", 1),
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+]
+
+
+def _create_channel(host: str, **kwargs: Any) -> grpc.Channel:
+    """Create a transport channel with CHANNEL_OPTIONS added to the defaults."""
+    kwargs["options"] = list(kwargs.get("options") or []) + CHANNEL_OPTIONS
+    return MatchServiceGrpcTransport.create_channel(host, **kwargs)
+
+
+class MatchClientPool:
+    """Round-robin pool of Vector Search clients, each on its own gRPC connection."""
+
+    def __init__(self, api_endpoint: str, pool_size: int = 4) -> None:
+        """
+        Initialize the client pool.
+
+        Args:
+            api_endpoint: Vector Search public endpoint domain
+            pool_size: Number of clients (and connections) in the pool
+        """
+        self.api_endpoint = api_endpoint
+        self.clients = [self._create_client(api_endpoint) for _ in range(max(1, pool_size))]
+        self._counter = itertools.count()
+
+    @staticmethod
+    def _create_client(api_endpoint: str) -> aiplatform_v1.MatchServiceClient:
+        """Create a MatchServiceClient on a dedicated channel."""
+        return aiplatform_v1.MatchServiceClient(
+            client_options={"api_endpoint": api_endpoint},
+            transport=functools.partial(MatchServiceGrpcTransport, channel=_create_channel)
+        )
+
+    def find_neighbors(
+        self,
+        request: aiplatform_v1.FindNeighborsRequest,
+        **kwargs: Any
+    ) -> aiplatform_v1.FindNeighborsResponse:
+        """Run find_neighbors on the next client in the pool."""
+        client = self.clients[next(self._counter) % len(self.clients)]
+        return client.find_neighbors(request, **kwargs)
@@ -12,17 +12,26 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Dict, List, Any
-import jsonschema
+import logging
+from operator import itemgetter
+import threading
+from typing import Any, Dict, List, Union
+
+from cachetools import TTLCache
+import fastjsonschema
 from google.cloud import aiplatform
+import numpy as np
 
+import config
 from schemas import (
+    SIMPLE_USER_PREFERENCES_VALIDATOR,
     USER_FEATURE_NAMES,
-    USER_FEATURES_SCHEMA,
-    SIMPLE_USER_PREFERENCES_SCHEMA
+    USER_FEATURES_VALIDATOR
 )
 from utils.logging import logger
-import config
+
+# Gathers the 55 feature values in USER_FEATURE_NAMES order in one C-level call
+_FEATURE_GETTER = itemgetter(*USER_FEATURE_NAMES)
 
 
 class ModelService:
@@ -53,7 +62,35 @@ class ModelService:
             location=config.MODEL_LOCATION
         )
         
+        # aiplatform.Endpoint() fetches the endpoint metadata with an RPC, so
+        # it is created once on first use and reused for every prediction
+        self._endpoint = None
+        self._endpoint_lock = threading.Lock()
+
+        # Embeddings for recently seen feature vectors; users often re-query
+        # with identical features within a short window
+        self.embedding_cache = None
+        if config.USER_EMBEDDING_CACHE_SIZE > 0:
+            self.embedding_cache = TTLCache(
+                maxsize=config.USER_EMBEDDING_CACHE_SIZE,
+                ttl=config.USER_EMBEDDING_CACHE_TTL_SECONDS
+            )
+            self._embedding_cache_lock = threading.Lock()
+
         logger.info("ModelService initialized", extra={"endpoint": self.endpoint_name})
+
+    def _get_endpoint(self) -> aiplatform.Endpoint:
+        """
+        Get the cached Vertex AI endpoint, creating it on first use.
+
+        Returns:
+            The aiplatform.Endpoint for self.endpoint_name
+        """
+        if self._endpoint is None:
+            with self._endpoint_lock:
+                if self._endpoint is None:
+                    self._endpoint = aiplatform.Endpoint(self.endpoint_name)
+        return self._endpoint
     
     def validate_user_features(self, data: Dict) -> None:
         """
@@ -66,8 +103,8 @@ class ModelService:
             ValueError: If validation fails
         """
         try:
-            jsonschema.validate(instance=data, schema=USER_FEATURES_SCHEMA)
-        except jsonschema.ValidationError as ve:
+            USER_FEATURES_VALIDATOR(data)
+        except fastjsonschema.JsonSchemaException as ve:
             raise ValueError(f"User features validation error: {ve.message}")
     
     def validate_simple_preferences(self, data: Dict) -> None:
@@ -81,23 +118,28 @@ class ModelService:
             ValueError: If validation fails
         """
         try:
-            jsonschema.validate(instance=data, schema=SIMPLE_USER_PREFERENCES_SCHEMA)
-        except jsonschema.ValidationError as ve:
+            SIMPLE_USER_PREFERENCES_VALIDATOR(data)
+        except fastjsonschema.JsonSchemaException as ve:
             raise ValueError(f"Simple preferences validation error: {ve.message}")
     
-    def features_dict_to_vector(self, features_dict: Dict) -> List[float]:
+    def features_dict_to_vector(self, features_dict: Dict) -> List[Union[int, float]]:
         """
         Convert flattened feature dictionary to ordered 55-dimensional vector.
+
+        The values are gathered as-is: validation guarantees every feature is a
+        JSON number, and the prediction request encodes instances as protobuf
+        doubles, so no per-feature float() pass is needed.
         
         Args:
-            features_dict: Dictionary with feature names as keys
+            features_dict: Validated dictionary with feature names as keys
             
         Returns:
-            List of 55 floats in the correct order defined by USER_FEATURE_NAMES
+            List of 55 numbers (ints or floats, as decoded from the JSON body)
+            in the correct order defined by USER_FEATURE_NAMES
         """
-        return [float(features_dict[name]) for name in USER_FEATURE_NAMES]
+        return list(_FEATURE_GETTER(features_dict))
     
-    def preprocess_user_data(self, data: Dict) -> List[float]:
+    def preprocess_user_data(self, data: Dict) -> List[Union[int, float]]:
         """
         Preprocess user data for model input.
         
@@ -109,7 +151,7 @@ class ModelService:
                   - Simple preferences (type, body, dryness, abv)
             
         Returns:
-            List of 55 floats ready for model prediction
+            List of 55 numbers ready for model prediction
             
         Raises:
             ValueError: If the data doesn't contain comprehensive features
@@ -117,7 +159,7 @@ class ModelService:
         if 'rating_mean' in data:
             self.validate_user_features(data)
             
-            # Convert to ordered vector of 55 floats
+            # Convert to ordered vector of 55 features
             feature_vector = self.features_dict_to_vector(data)
             
             logger.info(
@@ -134,7 +176,7 @@ class ModelService:
                 "Please provide all required user features."
             )
     
-    def generate_user_embedding(self, user_data: Dict) -> List[float]:
+    def generate_user_embedding(self, user_data: Dict) -> np.ndarray:
         """
         Generate user embedding using the Two Tower Model.
         
@@ -142,7 +184,8 @@ class ModelService:
             user_data: Dictionary containing flattened user features (55 key:value pairs)
             
         Returns:
-            List of floats representing the user embedding vector
+            1-D read-only float32 array representing the user embedding vector
+            (shared with the embedding cache when it is enabled)
             
         Raises:
             ValueError: If input validation fails
@@ -156,15 +199,23 @@ class ModelService:
             }
         )
 
-        # Preprocess the input data - returns list of 55 floats
+        # Preprocess the input data - returns list of 55 numbers
         feature_vector = self.preprocess_user_data(user_data)
+
+        cache_key = tuple(feature_vector)
+        if self.embedding_cache is not None:
+            with self._embedding_cache_lock:
+                cached = self.embedding_cache.get(cache_key)
+            if cached is not None:
+                logger.info("User embedding cache hit", extra={"embedding_dim": len(cached)})
+                return cached
         
         try:
             # Get the endpoint
-            endpoint = aiplatform.Endpoint(self.endpoint_name)
+            endpoint = self._get_endpoint()
             
             # Make prediction with the feature vector
-            # The endpoint expects: {"instances": [[...55 floats...]]}
+            # The endpoint expects: {"instances": [[...55 numbers...]]}
             logger.info("Calling model endpoint for prediction")
             prediction = endpoint.predict(instances=[feature_vector])
             
@@ -173,41 +224,39 @@ class ModelService:
             if hasattr(prediction, 'predictions') and len(prediction.predictions) > 0:
                 embedding = prediction.predictions[0]
                 
-                # Ensure it's a list of floats
-                if isinstance(embedding, list):
-                    user_embedding = [float(x) for x in embedding]
-                elif hasattr(embedding, 'tolist'):
-                    # Handle numpy arrays
-                    user_embedding = [float(x) for x in embedding.tolist()]
-                else:
+                # One C-level conversion to float32, the precision the vector
+                # index and the wine embedding matrix use
+                user_embedding = np.asarray(embedding, dtype=np.float32)
+                if user_embedding.ndim != 1:
                     raise Exception(f"Unexpected embedding format: {type(embedding)}")
-                
-                import numpy as np
-                
-                embedding_norm = np.linalg.norm(user_embedding)
-                embedding_min = min(user_embedding)
-                embedding_max = max(user_embedding)
-                embedding_mean = sum(user_embedding) / len(user_embedding)
-                
-                logger.info(
-                    "User embedding generated successfully", 
-                    extra={
-                        "embedding_dim": len(user_embedding),
-                        "input_features": len(feature_vector),
-                        "embedding_norm": embedding_norm,
-                        "embedding_min": embedding_min,
-                        "embedding_max": embedding_max,
-                        "embedding_mean": embedding_mean,
-                        "is_normalized": abs(embedding_norm - 1.0) < 0.01
-                    }
-                )
+
+                if logger.is_enabled_for(logging.INFO):
+                    embedding_norm = float(np.sqrt(user_embedding @ user_embedding))
+                    logger.info(
+                        "User embedding generated successfully",
+                        extra={
+                            "embedding_dim": len(user_embedding),
+                            "input_features": len(feature_vector),
+                            "embedding_norm": embedding_norm,
+                            "embedding_min": float(user_embedding.min()),
+                            "embedding_max": float(user_embedding.max()),
+                            "embedding_mean": float(user_embedding.mean()),
+                            "is_normalized": abs(embedding_norm - 1.0) < 0.01
+                        }
+                    )
+
+                if self.embedding_cache is not None:
+                    # Shared between requests from now on
+                    user_embedding.setflags(write=False)
+                    with self._embedding_cache_lock:
+                        self.embedding_cache[cache_key] = user_embedding
                 return user_embedding
             else:
                 raise Exception("No predictions returned from model endpoint")
                 
         except Exception as e:
             logger.error(
-                "Failed to generate user embedding", 
+                "Failed to generate user embedding",
                 extra={"error": str(e), "endpoint": self.endpoint_name}
             )
             raise Exception(f"Model prediction failed: {str(e)}")
@@ -12,9 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from typing import BinaryIO, List, Union
+
 from google.cloud import vision
 
 
+# Maximum number of images the Vision API accepts in one batch_annotate_images call
+_MAX_IMAGES_PER_BATCH = 16
+
+
 class OCRService:
     """Service for optical character recognition using Google Cloud Vision API."""
     
@@ -22,12 +28,13 @@ class OCRService:
         """Initialize the OCR service with Vision API client."""
         self.vision_client = vision.ImageAnnotatorClient()
     
-    def extract_text_from_image(self, image_content: bytes) -> str:
+    def extract_text_from_image(self, image_content: Union[bytes, BinaryIO]) -> str:
         """
         Extract text from an image using Google Cloud Vision API.
         
         Args:
-            image_content: Binary content of the image
+            image_content: Binary content of the image, or a binary file-like object
+                           (e.g. an upload stream) that is read once here
             
         Returns:
             Extracted text from the image
@@ -35,6 +42,11 @@ class OCRService:
         Raises:
             Exception: If Vision API encounters an error
         """
+        # Read file-like uploads directly into the request instead of
+        # buffering a separate copy in the caller
+        if hasattr(image_content, 'read'):
+            image_content = image_content.read()
+
         # Create Vision API image object
         image = vision.Image(content=image_content)
         
@@ -50,3 +62,42 @@ class OCRService:
             return texts[0].description
         else:
             return ""
+
+    def extract_text_from_images(self, images: List[Union[bytes, BinaryIO]]) -> List[str]:
+        """
+        Extract text from several images with batched Vision API calls.
+
+        Images are sent up to 16 per batch_annotate_images request, so N images
+        cost ceil(N / 16) round trips instead of N.
+
+        Args:
+            images: Binary contents of the images, or binary file-like objects
+
+        Returns:
+            Extracted text for each image, in input order
+
+        Raises:
+            Exception: If Vision API encounters an error for any image
+        """
+        feature = vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)
+        texts = []
+        for start in range(0, len(images), _MAX_IMAGES_PER_BATCH):
+            requests = []
+            for image_content in images[start:start + _MAX_IMAGES_PER_BATCH]:
+                if hasattr(image_content, 'read'):
+                    image_content = image_content.read()
+                requests.append(
+                    vision.AnnotateImageRequest(
+                        image=vision.Image(content=image_content),
+                        features=[feature]
+                    )
+                )
+
+            batch_response = self.vision_client.batch_annotate_images(requests=requests)
+            for response in batch_response.responses:
+                if response.error.message:
+                    raise Exception(f'Vision API error: {response.error.message}')
+                annotations = response.text_annotations
+                texts.append(annotations[0].description if annotations else "")
+
+        return texts
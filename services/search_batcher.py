@@ -0,0 +1,167 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import os
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Tuple, TYPE_CHECKING
+
+from utils.logging import logger
+
+if TYPE_CHECKING:
+    from google.cloud import aiplatform_v1
+
+# (feature_vector, neighbor_count), as accepted by WineService._find_neighbors
+Query = Tuple[List[float], int]
+Result = Optional["aiplatform_v1.FindNeighborsResponse.NearestNeighbors"]
+
+
+class SearchBatcher:
+    """Coalesces concurrent vector search queries into batched FindNeighbors calls."""
+
+    def __init__(
+        self,
+        search_fn: Callable[[List[Query]], List[Result]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+        result_timeout: Optional[float] = None
+    ) -> None:
+        """
+        Initialize the search batcher.
+
+        Args:
+            search_fn: Callable running one RPC for a list of queries and returning
+                       one result per query, in the same order
+            max_batch_size: Maximum number of queries sent in a single RPC
+            max_wait_ms: Maximum time to wait for more queries once a batch is open
+            result_timeout: Seconds a caller waits for its batched result before
+                            giving up; should exceed the RPC deadline. None waits forever.
+        """
+        self.search_fn = search_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.result_timeout = result_timeout
+
+        self._queue: "queue.Queue[Tuple[Query, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid: Optional[int] = None
+
+    def submit(self, query: Query) -> Result:
+        """
+        Run a single query, batching it with concurrent callers when the service is busy.
+
+        Args:
+            query: Query to run, in the form accepted by search_fn
+
+        Returns:
+            The nearest neighbors result for this query (None if the index returned none)
+
+        Raises:
+            TimeoutError: If the batched result does not arrive within result_timeout
+            Exception: If the vector search fails
+        """
+        with self._lock:
+            fast_path = self._in_flight == 0 and self._queue.empty()
+            if fast_path:
+                self._in_flight += 1
+
+        # Nothing else is waiting, so there is nothing to coalesce with
+        if fast_path:
+            try:
+                return self.search_fn([query])[0]
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((query, future))
+        try:
+            return future.result(timeout=self.result_timeout)
+        except FutureTimeoutError:
+            # Drop the query if the worker has not picked it up yet
+            future.cancel()
+            logger.error(
+                "Batched vector search timed out",
+                extra={"timeout_seconds": self.result_timeout}
+            )
+            raise TimeoutError(
+                f"Vector search did not complete within {self.result_timeout} seconds"
+            )
+
+    def _ensure_worker(self) -> None:
+        """Start the worker thread lazily (threads do not survive a pre-fork)."""
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name="search-batcher", daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
+
+    def _collect_batch(self) -> List[Tuple[Query, Future]]:
+        """
+        Block for the first query, then gather more until the batch is full or the window closes.
+
+        The worker counts as in flight from the first query on, so callers
+        arriving while the batch is open queue up and join it instead of
+        taking the fast path. _run releases the count after the RPC.
+        """
+        batch = [self._queue.get()]
+        with self._lock:
+            self._in_flight += 1
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self) -> None:
+        """Worker loop: send each collected batch as one RPC and fan results back out."""
+        while True:
+            batch = self._collect_batch()
+            try:
+                # Skip queries whose callers already gave up; the rest can no
+                # longer be cancelled, so setting their results is always valid
+                batch = [
+                    (query, future) for query, future in batch
+                    if future.set_running_or_notify_cancel()
+                ]
+                if not batch:
+                    continue
+                try:
+                    results = self.search_fn([query for query, _ in batch])
+                except Exception as e:
+                    for _, future in batch:
+                        future.set_exception(e)
+                    continue
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+            logger.debug("Vector search batch completed", extra={"batch_size": len(batch)})
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -12,17 +12,68 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Dict, List, Tuple, Optional, TYPE_CHECKING, Any
-import jsonschema
-from google.cloud import aiplatform_v1
+import hashlib
+import logging
+from operator import attrgetter
+import threading
+from typing import Dict, List, Tuple, Optional, TYPE_CHECKING, Any, Union
 
-from schemas import WINE_SCHEMA, WINE_QUERY_SCHEMA
-from config import INDEX_ENDPOINT, DEPLOYED_INDEX_ID
+from cachetools import TTLCache
+from google.cloud import aiplatform_v1
+import numpy as np
+import orjson
+
+from config import (
+    INDEX_ENDPOINT,
+    DEPLOYED_INDEX_ID,
+    DEFAULT_NEIGHBOR_COUNT,
+    VECTOR_SEARCH_BATCHING,
+    VECTOR_SEARCH_BATCH_MAX_SIZE,
+    VECTOR_SEARCH_BATCH_WAIT_MS,
+    VECTOR_SEARCH_TIMEOUT_SECONDS,
+    RECOMMENDATION_CACHE_SIZE,
+    RECOMMENDATION_CACHE_TTL_SECONDS
+)
+from services.search_batcher import SearchBatcher
 from utils.logging import logger
 
 if TYPE_CHECKING:
     from services.model_service import ModelService
     from services.embeddings_service import EmbeddingsService
+    from services.match_client_pool import MatchClientPool
+
+# Static request fields, copied into every FindNeighbors request instead of
+# constructing the proto-plus messages from scratch per call.
+# return_full_datapoint is not needed for the dot product model.
+_FIND_NEIGHBORS_TEMPLATE = aiplatform_v1.FindNeighborsRequest.pb(
+    aiplatform_v1.FindNeighborsRequest(
+        index_endpoint=INDEX_ENDPOINT,
+        deployed_index_id=DEPLOYED_INDEX_ID,
+        return_full_datapoint=False,
+    )
+)
+
+# Proto-plus class methods used on every search, bound once at import
+_wrap_find_neighbors_request = aiplatform_v1.FindNeighborsRequest.wrap
+_nearest_neighbors_pb = aiplatform_v1.FindNeighborsResponse.NearestNeighbors.pb
+
+# Reads (datapoint_id, distance) from a raw FindNeighborsResponse.Neighbor
+_NEIGHBOR_FIELDS = attrgetter("datapoint.datapoint_id", "distance")
+
+
+def _preferences_digest(user_preferences: Dict) -> bytes:
+    """
+    Canonical 16-byte digest of a preferences dict (independent of key order).
+
+    The optional user_id does not affect the embedding, so it is left out and
+    identical features from different users share a digest.
+    """
+    if "user_id" in user_preferences:
+        user_preferences = {k: v for k, v in user_preferences.items() if k != "user_id"}
+    return hashlib.blake2b(
+        orjson.dumps(user_preferences, option=orjson.OPT_SORT_KEYS),
+        digest_size=16
+    ).digest()
 
 
 class WineService:
@@ -30,7 +81,7 @@ class WineService:
 
     def __init__(
         self,
-        vector_search_client: aiplatform_v1.MatchServiceClient,
+        vector_search_client: Union[aiplatform_v1.MatchServiceClient, 'MatchClientPool'],
         model_service: Optional['ModelService'] = None,
         embeddings_service: Optional['EmbeddingsService'] = None,
         similarity_service: Optional[Any] = None  # Deprecated: not used with dot product model
@@ -39,7 +90,7 @@ class WineService:
         Initialize the wine service.
 
         Args:
-            vector_search_client: Initialized Vertex AI Match Service client
+            vector_search_client: Initialized Vertex AI Match Service client or MatchClientPool
             model_service: Optional ModelService for generating user embeddings
             embeddings_service: Optional EmbeddingsService for scoring specific wines
             similarity_service: Deprecated parameter (kept for backward compatibility, ignored)
@@ -48,17 +99,42 @@ class WineService:
         self.model_service = model_service
         self.embeddings_service = embeddings_service
         # similarity_service is deprecated - dot product model doesn't need it
+
+        # Optionally coalesce concurrent queries into a single FindNeighbors RPC
+        self.search_batcher = None
+        if VECTOR_SEARCH_BATCHING:
+            self.search_batcher = SearchBatcher(
+                self._find_neighbors,
+                max_batch_size=VECTOR_SEARCH_BATCH_MAX_SIZE,
+                max_wait_ms=VECTOR_SEARCH_BATCH_WAIT_MS,
+                # A queued caller may wait for the batch already in flight, its
+                # own batch window and its own RPC; longer means the worker is stuck
+                result_timeout=2 * VECTOR_SEARCH_TIMEOUT_SECONDS + 2 * VECTOR_SEARCH_BATCH_WAIT_MS / 1000.0
+            )
+
+        # Recommendations for recently seen preferences (pagination, resubmits)
+        self.recommendation_cache = None
+        if RECOMMENDATION_CACHE_SIZE > 0:
+            self.recommendation_cache = TTLCache(
+                maxsize=RECOMMENDATION_CACHE_SIZE,
+                ttl=RECOMMENDATION_CACHE_TTL_SECONDS
+            )
+            self._recommendation_cache_lock = threading.Lock()
+
         logger.info(
             "WineService initialized",
             extra={
                 "has_model_service": model_service is not None,
                 "has_embeddings_service": embeddings_service is not None,
+                "search_batching": self.search_batcher is not None,
+                "recommendation_cache": self.recommendation_cache is not None,
                 "model_type": "dot_product",
                 "output_format": "raw_dot_products"
             }
         )
     
-    def normalize_distances(self, wine_ids: List[str], distances: List[float]) -> Dict[str, float]:
+    @staticmethod
+    def normalize_distances(wine_ids: List[str], distances: List[float]) -> Dict[str, float]:
         """
         Map wine IDs to their dot product distances.
 
@@ -80,11 +156,20 @@ class WineService:
         if not distances:
             return {}
 
-        dot_products = {}
+        # Nothing to summarize for a single neighbor (e.g. top-1 lookups)
+        if len(distances) == 1:
+            return {wine_ids[0]: float(distances[0])}
 
-        min_dot = min(distances)
-        max_dot = max(distances)
-        mean_dot = sum(distances) / len(distances)
+        # Everything below only feeds the INFO summaries
+        if not logger.is_enabled_for(logging.INFO):
+            return dict(zip(wine_ids, map(float, distances)))
+
+        # One contiguous array for all reductions instead of repeated Python passes
+        distances_arr = np.asarray(distances, dtype=np.float64)
+
+        min_dot = float(distances_arr.min())
+        max_dot = float(distances_arr.max())
+        mean_dot = float(distances_arr.mean())
         dot_range = max_dot - min_dot
 
         logger.info(
@@ -95,19 +180,29 @@ class WineService:
                 "max_dot_product": max_dot,
                 "mean_dot_product": mean_dot,
                 "dot_product_range": dot_range,
-                "raw_dot_products": distances[:10] if len(distances) >= 10 else distances
+                "raw_dot_products": distances_arr[:10].tolist()
             }
         )
 
-        for wine_id, dot_product in zip(wine_ids, distances):
-            dot_products[wine_id] = dot_product
-
+        dot_products = dict(zip(wine_ids, distances_arr.tolist()))
+
+        # Only the 5 values at each end are logged; partitioning around them
+        # is linear instead of sorting every neighbor
+        count = len(distances_arr)
+        if count > 10:
+            ends = np.partition(distances_arr, (4, count - 5))
+            bottom_5 = np.sort(ends[:5])
+            top_5 = np.sort(ends[-5:])[::-1]
+        else:
+            sorted_dots = np.sort(distances_arr)
+            bottom_5 = sorted_dots[:5]
+            top_5 = sorted_dots[::-1][:5]
         logger.info(
             "Dot product mapping complete",
             extra={
                 "wines_mapped": len(dot_products),
-                "top_5_dot_products": sorted(dot_products.values(), reverse=True)[:5],
-                "bottom_5_dot_products": sorted(dot_products.values())[:5] if len(dot_products) >= 5 else list(dot_products.values())
+                "top_5_dot_products": top_5.tolist(),
+                "bottom_5_dot_products": bottom_5.tolist() if len(dot_products) >= 5 else list(dot_products.values())
             }
         )
 
@@ -121,7 +216,7 @@ class WineService:
         self,
         user_preferences: Dict,
         user_id: Optional[str] = None,
-        neighbor_count: int = 10
+        neighbor_count: int = DEFAULT_NEIGHBOR_COUNT
     ) -> Tuple[List[str], Dict[str, float]]:
         """
         Get wine recommendations using the Two Tower Model.
@@ -141,11 +236,33 @@ class WineService:
             ValueError: If model service is not initialized
             Exception: If embedding generation or vector search fails
         """
+        cache_key = None
+        preferences_digest = None
+        if self.recommendation_cache is not None:
+            preferences_digest = _preferences_digest(user_preferences)
+            cache_key = (preferences_digest, neighbor_count)
+            with self._recommendation_cache_lock:
+                cached = self.recommendation_cache.get(cache_key)
+            if cached is not None:
+                logger.info(
+                    "Wine recommendations cache hit",
+                    extra={"user_id": user_id, "count": len(cached[0])}
+                )
+                # Copies, so callers cannot alter the cached entry
+                return list(cached[0]), dict(cached[1])
         
-        logger.info(
-            "Getting wine recommendations", 
-            extra={"preferences": user_preferences, "user_id": user_id}
-        )
+        if logger.is_enabled_for(logging.INFO):
+            # A digest instead of the full 55-feature dict keeps the log line small
+            if preferences_digest is None:
+                preferences_digest = _preferences_digest(user_preferences)
+            logger.info(
+                "Getting wine recommendations",
+                extra={
+                    "preferences_hash": preferences_digest.hex(),
+                    "preferences_count": len(user_preferences),
+                    "user_id": user_id
+                }
+            )
         
         # Generate user embedding using the Two Tower Model
         user_embedding = self.model_service.generate_user_embedding(user_preferences)
@@ -159,12 +276,17 @@ class WineService:
         wine_ids, dot_products = self.find_similar_wines(user_embedding, neighbor_count)
 
         logger.info("Wine recommendations retrieved", extra={"count": len(wine_ids)})
+
+        # Empty results are not cached so a transient miss is retried
+        if cache_key is not None and wine_ids:
+            with self._recommendation_cache_lock:
+                self.recommendation_cache[cache_key] = (list(wine_ids), dict(dot_products))
         return wine_ids, dot_products
     
     def find_similar_wines(
         self,
         wine_vector: List[float],
-        neighbor_count: int = 10,
+        neighbor_count: int = DEFAULT_NEIGHBOR_COUNT,
         use_similarity_layer: bool = False  # Deprecated: dot product model doesn't need similarity layer
     ) -> Tuple[List[str], Dict[str, float]]:
         """
@@ -184,92 +306,103 @@ class WineService:
         Raises:
             Exception: If the vector search fails
         """
-        import numpy as np
-        
-        query_norm = np.linalg.norm(wine_vector)
-        query_min = min(wine_vector)
-        query_max = max(wine_vector)
-        query_mean = sum(wine_vector) / len(wine_vector)
-        
-        logger.info(
-            "Querying vector index for similar wines",
-            extra={
-                "query_vector_norm": query_norm,
-                "query_vector_dim": len(wine_vector),
-                "query_vector_min": query_min,
-                "query_vector_max": query_max,
-                "query_vector_mean": query_mean,
-                "is_normalized": abs(query_norm - 1.0) < 0.01,
-                "neighbor_count": neighbor_count,
-                "model_type": "dot_product"
-            }
-        )
-        
-        # No need to fetch full datapoints - we only need dot products
-        datapoint = aiplatform_v1.IndexDatapoint(feature_vector=wine_vector)
-        query = aiplatform_v1.FindNeighborsRequest.Query(
-            datapoint=datapoint, 
-            neighbor_count=neighbor_count
-        )
-        request_obj = aiplatform_v1.FindNeighborsRequest(
-            index_endpoint=INDEX_ENDPOINT,
-            deployed_index_id=DEPLOYED_INDEX_ID,
-            queries=[query],
-            return_full_datapoint=False,  # Not needed for dot product model
-        )
-        
-        try:
-            response = self.vector_search_client.find_neighbors(request_obj)
-        except Exception as e:
-            logger.error(
-                "Vector search failed",
+        if logger.is_enabled_for(logging.INFO):
+            # Convert once and reduce in C instead of separate Python passes
+            query_arr = np.asarray(wine_vector, dtype=np.float64)
+            query_norm = float(np.sqrt(query_arr @ query_arr))
+            logger.info(
+                "Querying vector index for similar wines",
                 extra={
-                    "error": str(e),
-                    "error_type": type(e).__name__,
-                    "index_endpoint": INDEX_ENDPOINT,
-                    "deployed_index_id": DEPLOYED_INDEX_ID
+                    "query_vector_norm": query_norm,
+                    "query_vector_dim": len(wine_vector),
+                    "query_vector_min": float(query_arr.min()),
+                    "query_vector_max": float(query_arr.max()),
+                    "query_vector_mean": float(query_arr.mean()),
+                    "is_normalized": abs(query_norm - 1.0) < 0.01,
+                    "neighbor_count": neighbor_count,
+                    "model_type": "dot_product"
                 }
             )
-            raise
+        
+        query = (wine_vector, neighbor_count)
 
-        # Log response structure for debugging
+        if self.search_batcher is not None:
+            first_result = self.search_batcher.submit(query)
+        else:
+            first_result = self._find_neighbors([query])[0]
+
+        return self._collect_neighbors(first_result)
+
+    def find_similar_wines_batch(
+        self,
+        wine_vectors: List[List[float]],
+        neighbor_count: int = DEFAULT_NEIGHBOR_COUNT
+    ) -> List[Tuple[List[str], Dict[str, float]]]:
+        """
+        Find similar wines for several query vectors with a single FindNeighbors RPC.
+
+        All vectors are packed into one request, so K queries cost one round
+        trip instead of K. Requests larger than VECTOR_SEARCH_BATCH_MAX_SIZE are
+        split into several RPCs of at most that many queries.
+
+        Args:
+            wine_vectors: Query vectors (user embeddings)
+            neighbor_count: Number of similar wines to return per query
+
+        Returns:
+            One (wine_ids, dot_products) tuple per query vector, in input order
+
+        Raises:
+            Exception: If the vector search fails
+        """
         logger.info(
-            "Vector search response received",
-            extra={
-                "has_nearest_neighbors": hasattr(response, 'nearest_neighbors'),
-                "nearest_neighbors_count": len(response.nearest_neighbors) if hasattr(response, 'nearest_neighbors') else 0,
-                "response_type": type(response).__name__
-            }
+            "Querying vector index for similar wines (batch)",
+            extra={"query_count": len(wine_vectors), "neighbor_count": neighbor_count}
         )
 
-        if not response.nearest_neighbors or len(response.nearest_neighbors) == 0:
+        results = []
+        for start in range(0, len(wine_vectors), VECTOR_SEARCH_BATCH_MAX_SIZE):
+            chunk = wine_vectors[start:start + VECTOR_SEARCH_BATCH_MAX_SIZE]
+            results.extend(self._find_neighbors([(vector, neighbor_count) for vector in chunk]))
+        return [self._collect_neighbors(result) for result in results]
+
+    def _collect_neighbors(
+        self,
+        result: Optional[aiplatform_v1.FindNeighborsResponse.NearestNeighbors]
+    ) -> Tuple[List[str], Dict[str, float]]:
+        """
+        Extract wine IDs and raw dot products from one query's nearest neighbors.
+
+        Args:
+            result: Nearest neighbors for a single query, or None if the index returned nothing
+
+        Returns:
+            Tuple of (wine_ids, dot_products) where dot_products is a dict mapping IDs to raw dot product values
+        """
+        if result is None:
             logger.warning("Vector search returned no neighbors")
             return [], {}
 
-        # Check if the first query result has neighbors
-        first_result = response.nearest_neighbors[0]
-        neighbor_count = len(first_result.neighbors) if hasattr(first_result, 'neighbors') else 0
+        # Check if the query result has neighbors
+        neighbor_count = len(result.neighbors) if hasattr(result, 'neighbors') else 0
 
         logger.info(
             "Vector search first result",
             extra={
                 "neighbor_count": neighbor_count,
-                "has_neighbors_attr": hasattr(first_result, 'neighbors')
+                "has_neighbors_attr": hasattr(result, 'neighbors')
             }
         )
 
-        if not first_result.neighbors or neighbor_count == 0:
+        if not result.neighbors or neighbor_count == 0:
             logger.warning("Vector search returned empty neighbor list")
             return [], {}
 
-        wine_neighbors = []
-        distances = []
-
         try:
-            for neighbor in response.nearest_neighbors[0].neighbors:
-                datapoint_id = neighbor.datapoint.datapoint_id
-                wine_neighbors.append(datapoint_id)
-                distances.append(neighbor.distance)  # This is the dot product
+            # Read the raw protobuf neighbors; proto-plus attribute access is
+            # much slower per field. Distances are the dot products.
+            neighbors_pb = _nearest_neighbors_pb(result).neighbors
+            wine_neighbors, distances = map(list, zip(*map(_NEIGHBOR_FIELDS, neighbors_pb)))
         except Exception as e:
             logger.error(
                 "Error processing vector search results",
@@ -289,6 +422,66 @@ class WineService:
         dot_products = self.normalize_distances(wine_neighbors, distances)
         return wine_neighbors, dot_products
 
+    def _find_neighbors(
+        self,
+        queries: List[Tuple[List[float], int]]
+    ) -> List[Optional[aiplatform_v1.FindNeighborsResponse.NearestNeighbors]]:
+        """
+        Run a single FindNeighbors RPC for one or more queries.
+
+        Args:
+            queries: (feature_vector, neighbor_count) pairs to send in the request
+
+        Returns:
+            One nearest neighbors result per query, in query order (None where the index returned nothing)
+
+        Raises:
+            Exception: If the vector search fails
+        """
+        request_pb = type(_FIND_NEIGHBORS_TEMPLATE)()
+        request_pb.CopyFrom(_FIND_NEIGHBORS_TEMPLATE)
+        for feature_vector, neighbor_count in queries:
+            # Protobuf copies a list of Python floats far faster than it
+            # iterates NumPy scalars, so convert arrays in one C-level call
+            if hasattr(feature_vector, 'tolist'):
+                feature_vector = feature_vector.tolist()
+            query = request_pb.queries.add()
+            query.neighbor_count = neighbor_count
+            query.datapoint.feature_vector.extend(feature_vector)
+        # wrap() reuses the raw message instead of copying it
+        request_obj = _wrap_find_neighbors_request(request_pb)
+
+        try:
+            response = self.vector_search_client.find_neighbors(
+                request_obj, timeout=VECTOR_SEARCH_TIMEOUT_SECONDS
+            )
+        except Exception as e:
+            logger.error(
+                "Vector search failed",
+                extra={
+                    "error": str(e),
+                    "error_type": type(e).__name__,
+                    "query_count": len(queries),
+                    "index_endpoint": INDEX_ENDPOINT,
+                    "deployed_index_id": DEPLOYED_INDEX_ID
+                }
+            )
+            raise
+
+        # Log response structure for debugging
+        logger.info(
+            "Vector search response received",
+            extra={
+                "query_count": len(queries),
+                "nearest_neighbors_count": len(response.nearest_neighbors),
+                "response_type": type(response).__name__
+            }
+        )
+
+        results = list(response.nearest_neighbors)
+        results.extend([None] * (len(queries) - len(results)))
+        return results
+
     def score_wines(
         self,
         user_embedding: List[float],
@@ -314,8 +507,6 @@ class WineService:
         if not self.embeddings_service:
             raise ValueError("Embeddings service not initialized")
 
-        import numpy as np
-
         logger.info(
             "Calculating dot products for specific wines",
             extra={
@@ -324,16 +515,22 @@ class WineService:
             }
         )
 
-        # Load wine embeddings (O(1) per wine)
-        wine_embeddings = self.embeddings_service.get_embeddings(wine_ids)
+        # Gather the wine embeddings as one (N, D) matrix so all dot
+        # products come from a single BLAS matrix-vector product
+        found_ids, wine_matrix = self.embeddings_service.get_embedding_matrix(wine_ids)
 
-        if not wine_embeddings:
+        if not found_ids:
             logger.warning("No wine embeddings found for provided IDs")
             return {}
 
-        # Calculate dot products
-        dot_products = {}
-        user_vec = np.array(user_embedding)
+        user_vec = np.asarray(user_embedding, dtype=np.float32)
+
+        scores = wine_matrix @ user_vec
+        dot_products = dict(zip(found_ids, scores.tolist()))
+
+        # The remaining work only feeds log lines
+        if not logger.is_enabled_for(logging.INFO):
+            return dot_products
 
         # Log user vector stats
         user_norm = np.linalg.norm(user_vec)
@@ -348,30 +545,22 @@ class WineService:
             }
         )
 
-        wine_norms = []
-        for wine_id, wine_embedding in wine_embeddings.items():
-            wine_vec = np.array(wine_embedding)
-            wine_norm = np.linalg.norm(wine_vec)
-            wine_norms.append(wine_norm)
+        wine_norms = np.linalg.norm(wine_matrix, axis=1)
 
-            # Calculate dot product
-            dot_product = float(np.dot(user_vec, wine_vec))
-            dot_products[wine_id] = dot_product
-
-            # Log first wine in detail
-            if len(dot_products) == 1:
-                logger.info(
-                    "First wine vector stats",
-                    extra={
-                        "wine_id": wine_id,
-                        "wine_norm": float(wine_norm),
-                        "wine_min": float(np.min(wine_vec)),
-                        "wine_max": float(np.max(wine_vec)),
-                        "wine_mean": float(np.mean(wine_vec)),
-                        "wine_std": float(np.std(wine_vec)),
-                        "dot_product": dot_product
-                    }
-                )
+        # Log first wine in detail
+        first_wine = wine_matrix[0]
+        logger.info(
+            "First wine vector stats",
+            extra={
+                "wine_id": found_ids[0],
+                "wine_norm": float(wine_norms[0]),
+                "wine_min": float(np.min(first_wine)),
+                "wine_max": float(np.max(first_wine)),
+                "wine_mean": float(np.mean(first_wine)),
+                "wine_std": float(np.std(first_wine)),
+                "dot_product": float(scores[0])
+            }
+        )
 
         logger.info(
             "Dot product calculation complete",
@@ -379,10 +568,10 @@ class WineService:
                 "wines_requested": len(wine_ids),
                 "wines_calculated": len(dot_products),
                 "wines_not_found": len(wine_ids) - len(dot_products),
-                "dot_products_range": [min(dot_products.values()), max(dot_products.values())] if dot_products else [0, 0],
-                "mean_dot_product": sum(dot_products.values()) / len(dot_products) if dot_products else 0,
-                "wine_norms_range": [min(wine_norms), max(wine_norms)] if wine_norms else [0, 0],
-                "mean_wine_norm": sum(wine_norms) / len(wine_norms) if wine_norms else 0
+                "dot_products_range": [float(scores.min()), float(scores.max())],
+                "mean_dot_product": float(scores.mean()),
+                "wine_norms_range": [float(wine_norms.min()), float(wine_norms.max())],
+                "mean_wine_norm": float(wine_norms.mean())
             }
         )
 
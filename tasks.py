@@ -68,7 +68,7 @@ def setup_virtualenv(c):  # noqa: ANN001, ANN201
 def start(c):  # noqa: ANN001, ANN201
     """Start the web service"""
     with c.prefix(venv):
-        c.run("python app.py")
+        c.run("gunicorn -c gunicorn.conf.py app:app")
 
 
 @task(pre=[require_venv])
@@ -0,0 +1,195 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import os
+import pathlib
+import tempfile
+from typing import Dict, IO, List, Optional
+
+import numpy as np
+import orjson
+import pytest
+
+import config
+from services import embeddings_service as embeddings_module
+from services.embeddings_service import EmbeddingsService
+
+GCS_URI = "gs://test-bucket/embeddings/wines.jsonl"
+EMBEDDINGS = {"100001": [1.0, 0.0, 0.0], "100002": [0.0, 0.5, 0.5]}
+
+
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", name: str, data: bytes = b"", generation: int = 1) -> None:
+        self.bucket = bucket
+        self.name = name
+        self.data = data
+        self.generation = generation
+        self.metadata: Optional[Dict[str, str]] = None
+        self.reads = 0
+
+    def reload(self) -> None:
+        pass
+
+    def open(self, mode: str) -> IO[bytes]:
+        self.reads += 1
+        return io.BytesIO(self.data)
+
+    def download_as_bytes(self) -> bytes:
+        self.reads += 1
+        return self.data
+
+    def upload_from_string(self, data: bytes, content_type: str) -> None:
+        self.data = data
+        self.bucket.blobs[self.name] = self
+
+
+class FakeBucket:
+    def __init__(self) -> None:
+        self.blobs: Dict[str, FakeBlob] = {}
+
+    def blob(self, name: str) -> FakeBlob:
+        return self.blobs.get(name) or FakeBlob(self, name)
+
+    def get_blob(self, name: str) -> Optional[FakeBlob]:
+        return self.blobs.get(name)
+
+    def add(self, name: str, data: bytes, generation: int = 1, metadata: Optional[Dict[str, str]] = None) -> FakeBlob:
+        blob = FakeBlob(self, name, data, generation)
+        blob.metadata = metadata
+        self.blobs[name] = blob
+        return blob
+
+
+class FakeStorageClient:
+    def __init__(self, bucket: FakeBucket) -> None:
+        self._bucket = bucket
+
+    def bucket(self, name: str) -> FakeBucket:
+        return self._bucket
+
+
+def _jsonl(embeddings: Dict[str, List[float]]) -> bytes:
+    return b"".join(orjson.dumps({"id": wine_id, "embedding": vector}) + b"\n" for wine_id, vector in embeddings.items())
+
+
+def _npy(matrix: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, matrix)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def bucket(monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path) -> FakeBucket:
+    fake_bucket = FakeBucket()
+    fake_bucket.add("embeddings/wines.jsonl", _jsonl(EMBEDDINGS), generation=7)
+    monkeypatch.setattr(embeddings_module.storage, "Client", lambda: FakeStorageClient(fake_bucket))
+    # Keep the shared local .npy copies inside the test's own directory
+    monkeypatch.setattr(tempfile, "gettempdir", lambda: str(tmp_path))
+    monkeypatch.setattr(config, "EMBEDDINGS_NPY_CACHE", True)
+    monkeypatch.setattr(config, "EMBEDDINGS_NPY_CACHE_PUBLISH", False)
+    monkeypatch.setattr(config, "EMBEDDINGS_DTYPE", "float32")
+    return fake_bucket
+
+
+def _assert_embeddings(service: EmbeddingsService) -> None:
+    found_ids, matrix = service.get_embedding_matrix(["100002", "missing", "100001"])
+    assert found_ids == ["100002", "100001"]
+    assert matrix.dtype == np.float32
+    np.testing.assert_array_equal(matrix, [EMBEDDINGS["100002"], EMBEDDINGS["100001"]])
+    assert service.get_total_count() == 2
+
+
+def test_parses_jsonl_without_publishing_by_default(bucket: FakeBucket) -> None:
+    service = EmbeddingsService(GCS_URI)
+
+    _assert_embeddings(service)
+    assert set(bucket.blobs) == {"embeddings/wines.jsonl"}
+
+
+def test_publishes_npy_cache_when_enabled(bucket: FakeBucket, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "EMBEDDINGS_NPY_CACHE_PUBLISH", True)
+
+    EmbeddingsService(GCS_URI)
+
+    npy_blob = bucket.blobs["embeddings/wines.jsonl.npy"]
+    ids_blob = bucket.blobs["embeddings/wines.jsonl.ids.json"]
+    assert npy_blob.metadata == ids_blob.metadata == {"source_generation": "7"}
+    assert orjson.loads(ids_blob.data) == ["100001", "100002"]
+
+
+def test_second_worker_maps_local_cache(bucket: FakeBucket) -> None:
+    EmbeddingsService(GCS_URI)
+    source = bucket.blobs["embeddings/wines.jsonl"]
+    reads = source.reads
+
+    service = EmbeddingsService(GCS_URI)
+
+    _assert_embeddings(service)
+    assert source.reads == reads
+    assert isinstance(service._matrix, np.memmap)
+
+
+def test_loads_current_gcs_npy_cache(bucket: FakeBucket) -> None:
+    matrix = np.array([EMBEDDINGS["100001"], EMBEDDINGS["100002"]], dtype=np.float32)
+    bucket.add("embeddings/wines.jsonl.npy", _npy(matrix), metadata={"source_generation": "7"})
+    bucket.add(
+        "embeddings/wines.jsonl.ids.json", orjson.dumps(["100001", "100002"]), metadata={"source_generation": "7"}
+    )
+
+    service = EmbeddingsService(GCS_URI)
+
+    _assert_embeddings(service)
+    assert bucket.blobs["embeddings/wines.jsonl"].reads == 0
+
+
+def test_stale_gcs_npy_cache_is_ignored(bucket: FakeBucket) -> None:
+    stale = np.zeros((1, 3), dtype=np.float32)
+    bucket.add("embeddings/wines.jsonl.npy", _npy(stale), metadata={"source_generation": "6"})
+    bucket.add("embeddings/wines.jsonl.ids.json", orjson.dumps(["999999"]), metadata={"source_generation": "6"})
+
+    service = EmbeddingsService(GCS_URI)
+
+    _assert_embeddings(service)
+    assert bucket.blobs["embeddings/wines.jsonl"].reads == 1
+
+
+def test_malformed_local_cache_falls_back_to_jsonl(bucket: FakeBucket) -> None:
+    service = EmbeddingsService(GCS_URI)
+    matrix_path, ids_path = service._local_cache_paths(bucket.blobs["embeddings/wines.jsonl"])
+    # IDs no longer match the matrix rows
+    with open(ids_path, "wb") as f:
+        f.write(orjson.dumps(["100001"]))
+
+    service = EmbeddingsService(GCS_URI)
+
+    _assert_embeddings(service)
+    assert bucket.blobs["embeddings/wines.jsonl"].reads == 2
+    assert os.path.exists(matrix_path)
+
+
+def test_float16_storage(bucket: FakeBucket, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "EMBEDDINGS_DTYPE", "float16")
+
+    service = EmbeddingsService(GCS_URI)
+
+    assert service._matrix.dtype == np.float16
+    _assert_embeddings(service)
+
+
+def test_unsupported_dtype_is_rejected(bucket: FakeBucket, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "EMBEDDINGS_DTYPE", "int8")
+
+    with pytest.raises(ValueError, match="EMBEDDINGS_DTYPE"):
+        EmbeddingsService(GCS_URI)
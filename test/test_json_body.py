@@ -0,0 +1,60 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import flask
+from flask.testing import FlaskClient
+import pytest
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, UnsupportedMediaType
+
+from utils.json_body import get_json_body
+
+bare_app = flask.Flask(__name__)
+
+
+def test_decodes_json_body() -> None:
+    with bare_app.test_request_context(method="POST", json={"user_id": "abc", "limit": 3}):
+        assert get_json_body() == {"user_id": "abc", "limit": 3}
+
+
+def test_empty_body_returns_none() -> None:
+    with bare_app.test_request_context(method="POST", data=b"", content_type="application/json"):
+        assert get_json_body() is None
+
+
+def test_invalid_json_is_bad_request() -> None:
+    with bare_app.test_request_context(method="POST", data=b"{not json", content_type="application/json"):
+        with pytest.raises(BadRequest):
+            get_json_body()
+
+
+def test_non_json_content_type_is_unsupported() -> None:
+    with bare_app.test_request_context(method="POST", data=b"{}", content_type="text/plain"):
+        with pytest.raises(UnsupportedMediaType):
+            get_json_body()
+
+
+def test_oversized_body_is_rejected() -> None:
+    with bare_app.test_request_context(method="POST", json={"padding": "x" * 100}):
+        with pytest.raises(RequestEntityTooLarge):
+            get_json_body(max_bytes=64)
+
+
+def test_http_errors_are_json(app: flask.app.Flask, client: FlaskClient) -> None:
+    res = client.post("/wines", data=b"{not json", content_type="application/json")
+    assert res.status_code == 400
+    assert res.get_json() == {"error": "Invalid JSON body."}
+
+    res = client.post("/wines", data=b"rating_mean=4", content_type="text/plain")
+    assert res.status_code == 415
+    assert res.get_json() == {"error": "Request body must be JSON."}
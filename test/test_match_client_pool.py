@@ -0,0 +1,52 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+from typing import Dict, List, Tuple
+
+import pytest
+
+from services.match_client_pool import MatchClientPool
+
+
+class FakeMatchClient:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.requests: List[Tuple[str, Dict[str, float]]] = []
+
+    def find_neighbors(self, request: str, **kwargs: float) -> str:
+        self.requests.append((request, kwargs))
+        return self.name
+
+
+def test_find_neighbors_round_robin(monkeypatch: pytest.MonkeyPatch) -> None:
+    names = itertools.count()
+    monkeypatch.setattr(
+        MatchClientPool, "_create_client", staticmethod(lambda endpoint: FakeMatchClient(f"client-{next(names)}"))
+    )
+
+    pool = MatchClientPool("example.com", pool_size=3)
+    served = [pool.find_neighbors(f"request-{i}", timeout=5) for i in range(6)]
+
+    assert served == ["client-0", "client-1", "client-2"] * 2
+    assert pool.clients[0].requests == [("request-0", {"timeout": 5}), ("request-3", {"timeout": 5})]
+
+
+def test_pool_size_is_at_least_one(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(MatchClientPool, "_create_client", staticmethod(lambda endpoint: FakeMatchClient("only")))
+
+    pool = MatchClientPool("example.com", pool_size=0)
+
+    assert len(pool.clients) == 1
+    assert pool.find_neighbors("request") == "only"
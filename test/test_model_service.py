@@ -0,0 +1,97 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+import config
+from schemas import USER_FEATURE_NAMES
+from services.model_service import ModelService
+
+
+class FakePrediction:
+    def __init__(self, predictions: List[List[float]]) -> None:
+        self.predictions = predictions
+
+
+class FakeEndpoint:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def predict(self, instances: List[List[float]]) -> FakePrediction:
+        self.calls += 1
+        return FakePrediction([[0.6, 0.8, 0.0]])
+
+
+def _user_features(value: float = 0.5) -> Dict[str, float]:
+    return {name: value for name in USER_FEATURE_NAMES}
+
+
+@pytest.fixture
+def model_service() -> ModelService:
+    service = ModelService("projects/test/locations/us-central1/endpoints/1")
+    service._endpoint = FakeEndpoint()
+    return service
+
+
+def test_features_dict_to_vector_follows_feature_order(model_service: ModelService) -> None:
+    features = {name: float(i) for i, name in enumerate(USER_FEATURE_NAMES)}
+    assert model_service.features_dict_to_vector(features) == [float(i) for i in range(len(USER_FEATURE_NAMES))]
+
+
+def test_features_dict_to_vector_keeps_values_as_decoded(model_service: ModelService) -> None:
+    features = {name: i for i, name in enumerate(USER_FEATURE_NAMES)}
+    vector = model_service.features_dict_to_vector(features)
+    assert vector == list(range(len(USER_FEATURE_NAMES)))
+    assert all(type(value) is int for value in vector)
+
+
+def test_invalid_features_raise_value_error(model_service: ModelService) -> None:
+    features = _user_features()
+    del features["rating_trend"]
+    with pytest.raises(ValueError):
+        model_service.preprocess_user_data(features)
+
+
+def test_repeated_features_use_embedding_cache(model_service: ModelService) -> None:
+    first = model_service.generate_user_embedding(_user_features())
+    second = model_service.generate_user_embedding(_user_features())
+
+    assert model_service._endpoint.calls == 1
+    assert second is first
+    assert first.dtype == np.float32
+    np.testing.assert_allclose(first, [0.6, 0.8, 0.0])
+    # Shared between requests, so it must not be writable
+    assert not first.flags.writeable
+
+
+def test_different_features_miss_embedding_cache(model_service: ModelService) -> None:
+    model_service.generate_user_embedding(_user_features(0.5))
+    model_service.generate_user_embedding(_user_features(0.25))
+
+    assert model_service._endpoint.calls == 2
+
+
+def test_embedding_cache_can_be_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "USER_EMBEDDING_CACHE_SIZE", 0)
+    service = ModelService("projects/test/locations/us-central1/endpoints/1")
+    service._endpoint = FakeEndpoint()
+
+    service.generate_user_embedding(_user_features())
+    service.generate_user_embedding(_user_features())
+
+    assert service.embedding_cache is None
+    assert service._endpoint.calls == 2
@@ -0,0 +1,144 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import pytest
+
+from services.search_batcher import SearchBatcher
+
+
+def _hold_worker(batcher: SearchBatcher) -> None:
+    """Mark a query as in flight so submit() queues instead of taking the fast path."""
+    with batcher._lock:
+        batcher._in_flight += 1
+
+
+def _release_worker(batcher: SearchBatcher) -> None:
+    with batcher._lock:
+        batcher._in_flight -= 1
+
+
+def _submit_all(batcher: SearchBatcher, queries: List[Tuple[List[float], int]]) -> List:
+    """Submit each query from its own thread and return results (or exceptions) in order."""
+    results: List[Optional[object]] = [None] * len(queries)
+
+    def run(i: int) -> None:
+        try:
+            results[i] = batcher.submit(queries[i])
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(queries))]
+    for thread in threads:
+        thread.start()
+    # Let every caller enqueue before the worker closes the batch window
+    time.sleep(0.05)
+    _release_worker(batcher)
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+def test_single_query_runs_directly() -> None:
+    calls = []
+
+    def search(queries: List) -> List:
+        calls.append(queries)
+        return [f"result-{vector[0]}" for vector, _ in queries]
+
+    batcher = SearchBatcher(search)
+
+    assert batcher.submit(([1.0], 10)) == "result-1.0"
+    assert calls == [[([1.0], 10)]]
+    assert batcher._worker is None
+
+
+def test_concurrent_queries_are_coalesced() -> None:
+    calls = []
+
+    def search(queries: List) -> List:
+        calls.append(queries)
+        return [f"result-{vector[0]}" for vector, _ in queries]
+
+    batcher = SearchBatcher(search, max_batch_size=8, max_wait_ms=200)
+    _hold_worker(batcher)
+
+    queries = [([float(i)], 5) for i in range(4)]
+    results = _submit_all(batcher, queries)
+
+    assert results == [f"result-{float(i)}" for i in range(4)]
+    assert len(calls) == 1
+    assert sorted(calls[0]) == sorted(queries)
+
+
+def test_batch_error_is_raised_in_every_waiter() -> None:
+    def search(queries: List) -> List:
+        raise RuntimeError("index unavailable")
+
+    batcher = SearchBatcher(search, max_batch_size=8, max_wait_ms=200)
+    _hold_worker(batcher)
+
+    results = _submit_all(batcher, [([float(i)], 5) for i in range(3)])
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert all(str(result) == "index unavailable" for result in results)
+
+
+def test_stuck_worker_times_out() -> None:
+    release = threading.Event()
+
+    def search(queries: List) -> List:
+        release.wait(5)
+        return [None] * len(queries)
+
+    batcher = SearchBatcher(search, max_wait_ms=1, result_timeout=0.1)
+    _hold_worker(batcher)
+
+    try:
+        with pytest.raises(TimeoutError):
+            batcher.submit(([1.0], 5))
+    finally:
+        release.set()
+
+
+def test_caller_joins_the_batch_being_collected() -> None:
+    calls = []
+
+    def search(queries: List) -> List:
+        calls.append(queries)
+        return [f"result-{vector[0]}" for vector, _ in queries]
+
+    batcher = SearchBatcher(search, max_batch_size=8, max_wait_ms=300)
+    _hold_worker(batcher)
+
+    results: List[Optional[object]] = [None, None]
+
+    def run(i: int) -> None:
+        results[i] = batcher.submit(([float(i)], 5))
+
+    first = threading.Thread(target=run, args=(0,))
+    first.start()
+    # The worker has taken the first query and holds the batch window open
+    time.sleep(0.05)
+    _release_worker(batcher)
+    second = threading.Thread(target=run, args=(1,))
+    second.start()
+    first.join(timeout=5)
+    second.join(timeout=5)
+
+    assert results == ["result-0.0", "result-1.0"]
+    assert len(calls) == 1
@@ -0,0 +1,76 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Dict, List, Optional, Tuple
+
+import flask
+from flask import Blueprint
+from flask.testing import FlaskClient
+import numpy as np
+import pytest
+
+from routes import wine_routes
+
+
+class FakeModelService:
+    def generate_user_embedding(self, user_data: Dict) -> np.ndarray:
+        return np.ones(4, dtype=np.float32)
+
+
+class FakeWineService:
+    model_service = FakeModelService()
+
+    def get_wine_recommendations(
+        self, user_preferences: Dict, user_id: Optional[str] = None, neighbor_count: int = 10
+    ) -> Tuple[List[str], Dict[str, float]]:
+        wine_ids = ["100002", "100001"]
+        return wine_ids, {"100002": 0.9, "100001": 0.5}
+
+    def score_wines(self, user_embedding: np.ndarray, wine_ids: List[str]) -> Dict[str, float]:
+        return {"100001": 0.25, "100003": -0.5}
+
+
+@pytest.fixture
+def wine_client(monkeypatch: pytest.MonkeyPatch) -> FlaskClient:
+    # A fresh blueprint, so routes can be registered on a new app per test
+    monkeypatch.setattr(wine_routes, "wine_bp", Blueprint("wines", __name__, url_prefix="/wines"))
+    app = flask.Flask(__name__)
+    app.register_blueprint(wine_routes.create_wine_routes(FakeWineService()))
+    return app.test_client()
+
+
+def test_recommend_returns_id_keyed_dot_products(wine_client: FlaskClient) -> None:
+    res = wine_client.post("/wines/recommend", json={"rating_mean": 4.0})
+    assert res.status_code == 200
+    assert res.get_json() == {"wines": ["100002", "100001"], "dot_products": {"100002": 0.9, "100001": 0.5}}
+
+
+def test_recommend_format_arrays(wine_client: FlaskClient) -> None:
+    res = wine_client.post("/wines/recommend?format=arrays", json={"rating_mean": 4.0})
+    assert res.status_code == 200
+    assert res.get_json() == {"wines": ["100002", "100001"], "dot_products": [0.9, 0.5]}
+
+
+def test_score_format_arrays(wine_client: FlaskClient) -> None:
+    res = wine_client.post(
+        "/wines/score?format=arrays",
+        json={"user_data": {"rating_mean": 4.0}, "wine_ids": ["100001", "100002", "100003"]}
+    )
+    assert res.status_code == 200
+    assert res.get_json() == {"wines": ["100001", "100003"], "dot_products": [0.25, -0.5]}
+
+
+def test_recommend_rejects_out_of_range_limit(wine_client: FlaskClient) -> None:
+    assert wine_client.post("/wines?limit=0", json={"rating_mean": 4.0}).status_code == 400
+    assert wine_client.post("/wines?limit=1001", json={"rating_mean": 4.0}).status_code == 400
@@ -0,0 +1,105 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pytest
+
+from services import wine_service as wine_service_module
+from services.wine_service import WineService
+
+
+class FakeModelService:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def generate_user_embedding(self, user_data: Dict) -> np.ndarray:
+        self.calls += 1
+        return np.ones(4, dtype=np.float32)
+
+
+def _make_service(results: Tuple[List[str], Dict[str, float]]) -> Tuple[WineService, List[int]]:
+    """WineService whose vector search returns results and records each neighbor_count."""
+    service = WineService(vector_search_client=None, model_service=FakeModelService())
+    searches: List[int] = []
+
+    def find_similar_wines(wine_vector: np.ndarray, neighbor_count: int = 10) -> Tuple[List[str], Dict[str, float]]:
+        searches.append(neighbor_count)
+        return list(results[0]), dict(results[1])
+
+    service.find_similar_wines = find_similar_wines
+    return service, searches
+
+
+def test_repeated_preferences_hit_recommendation_cache() -> None:
+    service, searches = _make_service((["100001", "100002"], {"100001": 0.9, "100002": 0.4}))
+
+    first = service.get_wine_recommendations({"rating_mean": 4.0, "rating_std": 0.5}, neighbor_count=2)
+    # Key order does not matter for the cache key
+    second = service.get_wine_recommendations({"rating_std": 0.5, "rating_mean": 4.0}, neighbor_count=2)
+
+    assert first == second == (["100001", "100002"], {"100001": 0.9, "100002": 0.4})
+    assert searches == [2]
+    assert service.model_service.calls == 1
+
+
+def test_user_id_is_not_part_of_recommendation_cache_key() -> None:
+    service, searches = _make_service((["100001"], {"100001": 0.9}))
+
+    first = service.get_wine_recommendations({"rating_mean": 4.0, "user_id": "user-a"}, "user-a", 2)
+    second = service.get_wine_recommendations({"rating_mean": 4.0, "user_id": "user-b"}, "user-b", 2)
+
+    assert first == second
+    assert searches == [2]
+    assert len(service.recommendation_cache) == 1
+
+
+def test_cached_recommendations_are_copies() -> None:
+    service, _ = _make_service((["100001"], {"100001": 0.9}))
+
+    wine_ids, dot_products = service.get_wine_recommendations({"rating_mean": 4.0})
+    wine_ids.append("mutated")
+    dot_products["mutated"] = 0.0
+
+    assert service.get_wine_recommendations({"rating_mean": 4.0}) == (["100001"], {"100001": 0.9})
+
+
+def test_limit_is_part_of_recommendation_cache_key() -> None:
+    service, searches = _make_service((["100001"], {"100001": 0.9}))
+
+    service.get_wine_recommendations({"rating_mean": 4.0}, neighbor_count=1)
+    service.get_wine_recommendations({"rating_mean": 4.0}, neighbor_count=5)
+
+    assert searches == [1, 5]
+
+
+def test_empty_recommendations_are_not_cached() -> None:
+    service, searches = _make_service(([], {}))
+
+    service.get_wine_recommendations({"rating_mean": 4.0})
+    service.get_wine_recommendations({"rating_mean": 4.0})
+
+    assert len(searches) == 2
+
+
+def test_recommendation_cache_can_be_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(wine_service_module, "RECOMMENDATION_CACHE_SIZE", 0)
+    service, searches = _make_service((["100001"], {"100001": 0.9}))
+
+    service.get_wine_recommendations({"rating_mean": 4.0})
+    service.get_wine_recommendations({"rating_mean": 4.0})
+
+    assert service.recommendation_cache is None
+    assert len(searches) == 2
@@ -0,0 +1,60 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Optional
+
+from flask import request
+import orjson
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, UnsupportedMediaType
+
+import config
+
+
+def get_json_body(max_bytes: Optional[int] = None) -> Any:
+    """Decode the JSON request body with orjson.
+
+    Oversized bodies are rejected from the Content-Length header before
+    anything is read, and the raw bytes are not cached on the request.
+
+    Args:
+        max_bytes: Maximum accepted body size (defaults to config.MAX_JSON_BODY_BYTES)
+
+    Returns:
+        The decoded JSON value, or None for an empty body
+
+    Raises:
+        UnsupportedMediaType: If the request is not JSON (415)
+        RequestEntityTooLarge: If the body exceeds max_bytes (413)
+        BadRequest: If the body is not valid JSON (400)
+    """
+    if max_bytes is None:
+        max_bytes = config.MAX_JSON_BODY_BYTES
+
+    if not request.is_json:
+        raise UnsupportedMediaType("Request body must be JSON.")
+
+    if request.content_length is not None and request.content_length > max_bytes:
+        raise RequestEntityTooLarge()
+
+    raw = request.get_data(cache=False)
+    # Chunked requests carry no Content-Length, so check what was read too
+    if len(raw) > max_bytes:
+        raise RequestEntityTooLarge()
+    if not raw:
+        return None
+
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        raise BadRequest("Invalid JSON body.")
@@ -12,11 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Dict
+import logging
+from typing import Dict, Optional
 
 from flask import request
 import structlog
 
+import config
 from utils import metadata
 
 
@@ -59,9 +61,15 @@ def trace_modifier(
     return event_dict
 
 
+def _resolve_log_level(name: str) -> Optional[int]:
+    """Map a LOG_LEVEL name such as "info" to its logging level, or None if unknown."""
+    return logging.getLevelNamesMapping().get(name.strip().upper())
+
+
 def getJSONLogger() -> structlog._config.BoundLoggerLazyProxy:
     """Create a JSON logger using the field name and trace modifiers created above"""
     # extend using https://www.structlog.org/en/stable/processors.html
+    level = _resolve_log_level(config.LOG_LEVEL)
     structlog.configure(
         processors=[
             structlog.stdlib.add_log_level,
@@ -71,9 +79,20 @@ def getJSONLogger() -> structlog._config.BoundLoggerLazyProxy:
             structlog.processors.TimeStamper("iso"),
             structlog.processors.JSONRenderer(),
         ],
-        wrapper_class=structlog.stdlib.BoundLogger,
+        # Filtering logger: calls below LOG_LEVEL return immediately, and
+        # logger.is_enabled_for() lets hot paths skip building log-only data
+        wrapper_class=structlog.make_filtering_bound_logger(
+            logging.INFO if level is None else level
+        ),
+        cache_logger_on_first_use=True,
     )
-    return structlog.get_logger()
+    json_logger = structlog.get_logger()
+    if level is None:
+        json_logger.warning(
+            "Unknown LOG_LEVEL, falling back to INFO",
+            extra={"log_level": config.LOG_LEVEL}
+        )
+    return json_logger
 
 
 logger = getJSONLogger()
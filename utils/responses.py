@@ -0,0 +1,50 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any
+
+from flask import Response
+import orjson
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    """Serialize a payload with orjson and wrap it in a JSON Response.
+
+    orjson is considerably faster than the stdlib encoder behind
+    flask.jsonify, and NumPy values can be returned without converting them
+    to Python objects first.
+    """
+    return Response(
+        orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype="application/json",
+    )
+
+
+def prebuilt_json(payload: Any) -> bytes:
+    """Serialize a constant payload once, typically at import time.
+
+    Pair with prebuilt_response to skip encoding fixed bodies (such as common
+    validation errors) on every request.
+    """
+    return orjson.dumps(payload)
+
+
+def prebuilt_response(body: bytes, status: int = 200) -> Response:
+    """Wrap an already-serialized JSON body in a Response.
+
+    A new Response is built per call because Flask and its extensions may
+    modify response objects after the view returns.
+    """
+    return Response(body, status=status, mimetype="application/json")